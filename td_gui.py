@@ -1,18 +1,182 @@
 #!/usr/bin/env python3
 import sys
 import os
+import io
+import codecs
+import functools
+import glob
+import hashlib
+import re
+import signal
+import string
+import textwrap
+import pickle
 import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, Union
-
+from types import SimpleNamespace
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# Ensure local package import works when run from this file
+sys.path.insert(0, os.path.dirname(__file__))
+
+# ANSI CSI sequences in command output (SGR colours, cursor/erase controls)
+_ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+# Top-level "Origin -> Destination" route header lines in `run` output. Lines
+# that are jump/cruise descriptions can also contain "->" and are excluded.
+# [^\S\n] keeps every match on a single line of the full output text.
+_ROUTE_START_RE = re.compile(
+    r"^(?![^\S\n]*(?:Jump|Direct|Supercruise)\b)[^\S\n]*(.+?)[^\S\n]*->[^\S\n]*(.+?)(?:[^\S\n]*\(score:.*)?[^\S\n]*$",
+    re.MULTILINE,
+)
+_WS_RE = re.compile(r"\s+")
+# Characters that force quoting of a preview argument
+_QUOTE_WS = frozenset(string.whitespace)
+# Line breaks in streamed output (progress lines end in a bare CR)
+_LINE_SPLIT_RE = re.compile(r"[\r\n]")
+# Output/log widgets keep at most this many lines (oldest are trimmed)
+_OUTPUT_MAX_LINES = 5000
+# Raw foreground output retained for route parsing, in characters
+_RAW_OUTPUT_MAX_CHARS = 4 * 1024 * 1024
+# Reader-thread output is applied to widgets in batches this often
+_OUTPUT_FLUSH_MS = 50
+# Quiet time after the last change before the preview is rebuilt or prefs
+# are saved: spans the gap between keystrokes, yet still feels immediate
+_DEBOUNCE_MS = 150
+
+_IS_WIN = sys.platform.startswith('win')
+
+_COMMANDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tradedangerous", "commands")
+
+# Option sections of the 'run' layout: (title, dests), first match wins
+_RUN_SECTIONS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("Required", ("capacity", "credits")),
+    ("Other", ("starting", "ending", "via", "limit", "blackMarket", "unique", "pruneScores", "shorten", "routes", "maxRoutes", "pruneHops")),
+    ("Travel", ("goalSystem", "loop", "direct", "hops", "maxJumpsPer", "maxLyPer", "emptyLyPer", "startJumps", "endJumps", "showJumps", "supply", "demand")),
+    ("Filters", ("avoid", "maxAge", "lsPenalty", "demand", "supply")),
+    ("Constraints", ("padSize", "noPlanet", "planetary", "fleet", "odyssey", "maxLs")),
+    ("Economy", ("minGainPerTon", "maxGainPerTon", "margin", "insurance")),
+    ("Display", ("checklist", "x52pro", "progress", "summary")),
+)
+
+
+def _norm_route_endpoint(s: str) -> str:
+    # Route card identity: whitespace-collapsed, upper-cased "System/Station"
+    return _WS_RE.sub(" ", (s or '').strip()).upper()
+
+
+def _quote_preview_arg(s: Any) -> str:
+    # For preview: trim leading/trailing whitespace, quote empty/spaced/path args
+    s = str(s).strip()
+    if not s or "/" in s or not _QUOTE_WS.isdisjoint(s):
+        return '"' + s.replace('"', '\\"') + '"'
+    return s
+
+
+def _stream_decoder() -> io.IncrementalNewlineDecoder:
+    # UTF-8 decoder for child output read in raw chunks: tolerates multibyte
+    # sequences split across reads and translates \r\n / \r like text mode
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")("replace"), translate=True)
+
+
+# Prefs/settings JSON: orjson when available (much faster on large prefs
+# snapshots), stdlib json otherwise. Both work on UTF-8 bytes.
 try:
-    # Ensure local package import works when run from this file
-    sys.path.insert(0, os.path.dirname(__file__))
-    from tradedangerous import commands as td_commands
-except Exception as e:
-    raise SystemExit(f"Failed to import tradedangerous: {e}")
+    import orjson as _orjson
+
+    def _json_dumps(obj: Any) -> bytes:
+        return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2 | _orjson.OPT_NON_STR_KEYS)
+
+    _json_loads = _orjson.loads
+except ImportError:
+    import json as _stdjson
+
+    def _json_dumps(obj: Any) -> bytes:
+        return _stdjson.dumps(obj, indent=2).encode('utf-8')
+
+    _json_loads = _stdjson.loads
+
+
+def _prefs_fingerprint(blob: bytes) -> bytes:
+    # Identity of a serialized prefs file, compared before rewriting it
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+def _cmd_state_filename(label: str) -> str:
+    # Per-command prefs file: readable slug plus a checksum of the full label
+    # so labels that slug alike ("a b" / "a_b") still get distinct files
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", label).strip("_")[:40]
+    return f"td_gui_cmd_{slug}_{zlib.crc32(label.encode('utf-8')):08x}.json"
+
+
+def _import_plugin(argv: Tuple[str, ...]) -> Optional[str]:
+    # Lower-cased -P/--plug value of an `import` argv, if any
+    for i, a in enumerate(argv):
+        if a in ('-P', '--plug') and i + 1 < len(argv):
+            return argv[i+1].lower()
+    return None
+
+
+# The two classifiers below are asked about the same few argv tuples over and
+# over (run, preempt, resume), so results are memoized per argv.
+@functools.lru_cache(maxsize=128)
+def _background_title_for_argv(full_args: Tuple[str, ...]) -> Optional[str]:
+    if len(full_args) < 4:
+        return None
+    sub = full_args[2]
+    if sub != 'import':
+        return None
+    argv = full_args[3:]
+    options_blob = " ".join(argv)
+    plug = _import_plugin(argv)
+    if plug == 'eddn':
+        if 'carrier_only' in options_blob or 'public_only' in options_blob:
+            return 'EDDN Live (Carriers)'
+        return 'EDDN Live (All)'
+    if plug == 'spansh':
+        return 'Import Spansh Galaxy'
+    if plug == 'eddblink':
+        if 'listings_live' in options_blob:
+            return 'EDDB Link (Live Listings)'
+        return 'EDDB Link Import'
+    return None
+
+
+@functools.lru_cache(maxsize=128)
+def _requires_db_exclusive_argv(full_args: Tuple[str, ...]) -> bool:
+    if len(full_args) < 3:
+        return False
+    sub = full_args[2]
+    if sub == 'buildcache':
+        return True
+    if sub != 'import':
+        return False
+    argv = full_args[3:]
+    options_blob = " ".join(argv)
+    plug = _import_plugin(argv)
+    if plug == 'eddblink':
+        # Heaviest when doing clean/all (full schema/data rebuild)
+        if 'clean' in options_blob or 'all' in options_blob:
+            return True
+    if plug == 'spansh':
+        # Large write import
+        return True
+    return False
+
+
+def _import_td_commands():
+    # Deferred: importing the package pulls in every command module, which is
+    # only needed when the command metadata cache is missing or stale.
+    try:
+        from tradedangerous import commands as td_commands
+    except Exception as e:
+        raise SystemExit(f"Failed to import tradedangerous: {e}")
+    return td_commands
 
 # --- GUI toolkit ---
 import tkinter as tk
@@ -22,6 +186,44 @@ from tkinter.scrolledtext import ScrolledText
 from tkinter import filedialog, messagebox
 
 
+# ---------- Theme ----------
+# Dracula-like base + project palette. Interned so every widget/style call
+# hands Tk the same string objects.
+COLORS = SimpleNamespace(
+    bg=sys.intern("#282a36"),               # Dracula background
+    panel=sys.intern("#1f2029"),            # Slightly darker panel surface
+    surface=sys.intern("#1c1e26"),          # Inputs / text areas
+    line=sys.intern("#44475a"),             # Lines / selection
+    fg=sys.intern("#f8f8f2"),               # Primary foreground
+    muted=sys.intern("#6272a4"),            # Subtle/help text
+    primary=sys.intern("#7849bf"),          # Provided primary
+    primaryActive=sys.intern("#8a5ad7"),    # Active/hover primary
+    secondary=sys.intern("#49a2bf"),        # Provided secondary
+    secondaryActive=sys.intern("#5cb3c9"),
+    success=sys.intern("#49bf60"),          # Provided 3rd
+)
+
+# Tk option database defaults for classic widgets (Text/Entry/Listbox/
+# Scrollbar popups): (pattern, COLORS attribute)
+_OPTION_PATTERNS = (
+    ('*Text.background', 'surface'),
+    ('*Text.foreground', 'fg'),
+    ('*Text.insertBackground', 'fg'),
+    # Entry insertion cursor color (for classic Tk widgets and some ttk themes)
+    ('*Entry.insertBackground', 'fg'),
+    ('*Text.selectBackground', 'line'),
+    ('*Text.selectForeground', 'fg'),
+    ('*Listbox.background', 'surface'),
+    ('*Listbox.foreground', 'fg'),
+    ('*Listbox.selectBackground', 'line'),
+    ('*Listbox.selectForeground', 'fg'),
+    ('*Scrollbar.background', 'panel'),
+    ('*Scrollbar.activeBackground', 'panel'),
+    ('*Scrollbar.troughColor', 'bg'),
+    ('*Scrollbar.arrowColor', 'fg'),
+)
+
+
 # ---------- Introspection models ----------
 
 @dataclass(eq=False)
@@ -29,65 +231,78 @@ class OptionSpec:
     args: Tuple[str, ...]
     kwargs: Dict[str, Any]
     group_id: Optional[int] = None
-
-    @property
-    def long_flag(self) -> str:
+    # Derived from args/kwargs once in __post_init__; read on every preview
+    long_flag: str = field(init=False, repr=False)
+    display_name: str = field(init=False, repr=False)
+    help: str = field(init=False, repr=False)
+    action: Optional[str] = field(init=False, repr=False)
+    is_flag: bool = field(init=False, repr=False)
+    is_positional: bool = field(init=False, repr=False)
+    key: str = field(init=False, repr=False)
+    metavar: Optional[str] = field(init=False, repr=False)
+    default: Any = field(init=False, repr=False)
+    choices: Optional[List[str]] = field(init=False, repr=False)
+    dest: Optional[str] = field(init=False, repr=False)
+    multiple: bool = field(init=False, repr=False)
+    # Saved-state keys this spec answers to, most specific first
+    state_keys: Tuple[str, ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        args, kw = self.args, self.kwargs
         # Prefer a long option (starts with --), else the first
-        longs = [a for a in self.args if a.startswith("--")]
-        return longs[0] if longs else self.args[0]
-
-    @property
-    def display_name(self) -> str:
-        return self.long_flag
-
-    @property
-    def help(self) -> str:
-        return self.kwargs.get("help", "")
-
-    @property
-    def action(self) -> Optional[str]:
-        return self.kwargs.get("action")
-
-    @property
-    def is_flag(self) -> bool:
-        return self.action == "store_true"
-
-    @property
-    def is_positional(self) -> bool:
+        longs = [a for a in args if a.startswith("--")]
+        self.long_flag = longs[0] if longs else args[0]
+        self.display_name = self.long_flag
+        self.help = kw.get("help", "")
+        self.action = kw.get("action")
+        self.is_flag = self.action == "store_true"
+        self.multiple = self.action == "append"
         # Positional args in our CLI have names without leading dashes
-        try:
-            first = self.args[0]
-        except Exception:
-            return False
-        return not (isinstance(first, str) and first.startswith("-"))
-
-    @property
-    def key(self) -> str:
+        first = args[0] if args else None
+        self.is_positional = first is not None and not (isinstance(first, str) and first.startswith("-"))
+        self.metavar = kw.get("metavar")
+        self.default = kw.get("default")
+        self.choices = kw.get("choices")
+        self.dest = kw.get("dest")
         # Stable identifier used for saving/restoring state
-        try:
-            return self.kwargs.get("dest") or (self.args[0] if self.args else self.long_flag.lstrip('-'))
-        except Exception:
-            return self.long_flag.lstrip('-')
+        self.key = self.dest or (args[0] if args else self.long_flag.lstrip('-'))
+        # Older/hand-edited prefs may use any of these names
+        keys = (self.key, self.dest, self.long_flag, self.long_flag.lstrip('-'), first)
+        self.state_keys = tuple(dict.fromkeys(k for k in keys if k))
 
-    @property
-    def metavar(self) -> Optional[str]:
-        return self.kwargs.get("metavar")
 
-    @property
-    def default(self) -> Any:
-        return self.kwargs.get("default")
+@dataclass(eq=False)
+class RowState:
+    """UI state for one option of a command form: its selector var, plus the
+    editor row (input var, widgets, grid slot) while it is selected."""
+    selected: tk.BooleanVar
+    # (display name, is_flag, is_positional, multiple) as used by _build_args
+    plan: Tuple[str, bool, bool, bool]
+    value: Optional[tk.Variable] = None  # BooleanVar for flags, else StringVar
+    widgets: Tuple[Any, ...] = ()          # (label, input, help label or None)
+    row: int = -1
 
     @property
-    def choices(self) -> Optional[List[str]]:
-        return self.kwargs.get("choices")
+    def help(self):
+        return self.widgets[2] if self.widgets else None
 
-    @property
-    def dest(self) -> Optional[str]:
-        return self.kwargs.get("dest")
 
-    @property
-    def multiple(self) -> bool:
-        return self.action == "append"
+@dataclass(eq=False)
+class BgSession:
+    """A background task tab: its process plus the widgets and state driving it.
+    Registered in _bg_sessions until _close_bg_tab removes it with the tab."""
+    proc: subprocess.Popen
+    tab: Any
+    output: Any
+    status_var: tk.StringVar
+    stop_btn: Any
+    progress: Any
+    start: float
+    logfile: str
+    title: str
+    stop_flag: Dict[str, bool]
+    args: List[str]
+    thread: Optional[threading.Thread] = None
 
 
 @dataclass
@@ -100,20 +315,74 @@ class CommandMeta:
     fixed_args: Optional[List[str]] = None
 
 
+class ParsedRoutes(NamedTuple):
+    """Routes found in `run` output, stored column-wise: entry i of every
+    field belongs to route i. Immutable, so cached results are shared."""
+    blocks: Tuple[str, ...] = ()
+    origs: Tuple[str, ...] = ()
+    dests: Tuple[str, ...] = ()
+    # Normalized (origin, destination) used to de-duplicate cards
+    keys: Tuple[Tuple[str, str], ...] = ()
+    # First line of each block
+    titles: Tuple[str, ...] = ()
+
+
 def _flatten_args(items: List[Any]) -> List[OptionSpec]:
     flat: List[OptionSpec] = []
-    for item in items or []:
+    append, extend = flat.append, flat.extend
+    for item in items or ():
         # MutuallyExclusiveGroup has 'arguments'
-        if hasattr(item, "arguments"):
-            gid = id(item)
-            for sub in getattr(item, "arguments", []):
-                flat.append(OptionSpec(tuple(sub.args), dict(sub.kwargs), group_id=gid))
+        group = getattr(item, "arguments", None)
+        if group is None:
+            append(OptionSpec(tuple(item.args), dict(item.kwargs)))
         else:
-            flat.append(OptionSpec(tuple(item.args), dict(item.kwargs)))
+            gid = id(item)
+            extend(OptionSpec(tuple(sub.args), dict(sub.kwargs), group_id=gid) for sub in group)
     return flat
 
 
+def _commands_cache_path() -> str:
+    return os.path.join(os.path.expanduser('~'), '.cache', 'td_gui', 'commands.pkl')
+
+
+def _commands_cache_key() -> int:
+    """Newest mtime (ns) of the command modules and of this file (which
+    defines the presets); any edit to either invalidates the cache."""
+    paths = glob.glob(os.path.join(_COMMANDS_DIR, "*.py"))
+    paths.append(os.path.abspath(__file__))
+    return max(os.stat(p).st_mtime_ns for p in paths)
+
+
 def load_commands() -> Dict[str, CommandMeta]:
+    """Return command metadata, served from the on-disk cache when the
+    command modules are unchanged since it was written."""
+    path = _commands_cache_path()
+    try:
+        key = _commands_cache_key()
+    except Exception:
+        key = None
+    if key is not None:
+        try:
+            with open(path, 'rb') as f:
+                cached_key, metas = pickle.load(f)
+            if cached_key == key and isinstance(metas, dict):
+                return metas
+        except Exception:
+            # Missing, unreadable or written by an incompatible version
+            pass
+    metas = _build_commands()
+    if key is not None:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                pickle.dump((key, metas), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            pass
+    return metas
+
+
+def _build_commands() -> Dict[str, CommandMeta]:
+    td_commands = _import_td_commands()
     metas: Dict[str, CommandMeta] = {}
     for cmd_name, module in td_commands.commandIndex.items():
         help_text = getattr(module, "help", cmd_name)
@@ -186,38 +455,79 @@ class TdGuiApp(tk.Tk):
         # Suspend preference writes during first-time UI construction
         self._suspend_save = True
 
-        # Theme colors (Dracula-like base + your palette)
-        self.colors: Dict[str, str] = {
-            "bg": "#282a36",           # Dracula background
-            "panel": "#1f2029",        # Slightly darker panel surface
-            "surface": "#1c1e26",      # Inputs / text areas
-            "line": "#44475a",         # Lines / selection
-            "fg": "#f8f8f2",           # Primary foreground
-            "muted": "#6272a4",        # Subtle/help text
-            "primary": "#7849bf",      # Provided primary
-            "primaryActive": "#8a5ad7",# Active/hover primary
-            "secondary": "#49a2bf",    # Provided secondary
-            "secondaryActive": "#5cb3c9",
-            "success": "#49bf60",      # Provided 3rd
-        }
-
         # Apply custom dark theme styling first
         self._apply_theme()
 
         # Data
         self.cmd_metas = load_commands()
         self.current_meta: Optional[CommandMeta] = None
-        self.widget_vars: Dict[OptionSpec, Dict[str, Any]] = {}
+        # Every option of the form, and the selected subset in editor order
+        self._rows: Dict[OptionSpec, RowState] = {}
+        self._selected: Dict[OptionSpec, RowState] = {}
+        # Option forms built once per command label and hidden/shown on switch.
+        # _rows/_selected/_help_labels alias the visible form's containers.
+        self._cmd_forms: Dict[str, Dict[str, Any]] = {}
+        self._form: Optional[Dict[str, Any]] = None
+        # Memo keys for _build_args / _update_preview
+        self._args_cache_key = None
+        self._args_cache: List[str] = []
+        self._preview_key = None
+        self._preview_text = ""
+        # -v/-q/-w switches for the current levels (see _update_verbosity_parts)
+        self._verbosity_parts: Tuple[str, ...] = ()
+        # Raw foreground output kept for route parsing (see _append_output)
+        self._raw_output: deque = deque()
+        self._raw_len = 0
+        # Bumped on every raw output change; keys the parsed-routes cache
+        self._raw_gen = 0
+        self._parsed_routes_cache: Optional[Tuple[int, ParsedRoutes]] = None
+        # Output tab text as last captured for prefs; re-read only when dirty
+        self._output_dirty = True
+        self._output_snapshot = ""
+        # Output text queued by reader threads, per widget (see _queue_output)
+        self._out_queues: Dict[Any, deque] = {}
+        self._out_flush_pending: set = set()
         # Foreground subprocess control (Output tab)
         self._proc = None
         self._stop_requested = False
-        # Background sessions (e.g., EDDN live) keyed by tab widget name
-        self._bg_sessions: Dict[str, Dict[str, Any]] = {}
-        self._bg_counter = 0
+        # Background sessions (e.g., EDDN live) keyed by tab widget name;
+        # _close_bg_tab removes an entry along with its tab
+        self._bg_sessions: Dict[str, BgSession] = {}
+        # Pending debounced preview rebuild (after() job id)
+        self._preview_pending = None
+        # Prefs are serialized on the Tk thread and written by this single
+        # worker, so writes land in order and never stall the UI
+        self._prefs_writer: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="td-gui-prefs")
+        # Each command's saved state lives in its own prefs file; only labels
+        # marked dirty are re-serialized. Fingerprints of the bytes on disk per
+        # path, and of writes queued but not yet done.
+        self._dirty_labels: set = set()
+        # Latest scroll positions not yet folded into prefs (see _queue_scroll_pref)
+        self._pending_scroll: Dict[str, List[float]] = {}
+        self._scroll_flush_job = None
+        # Per scroll target (Tk path): does the content overflow the view?
+        # Dropped on <Configure> and content changes (see _scroll_target)
+        self._overflow_cache: Dict[str, bool] = {}
+        self._overflow_bound: set = set()
+        self._file_hashes: Dict[str, bytes] = {}
+        self._file_pending: Dict[str, bytes] = {}
+        # All three are Tk-thread only. The writer thread never touches them
+        # (nor Tk): it posts each outcome here, taken in by _drain_prefs_results
+        self._prefs_results: deque = deque()
+        # Bumped when prefs are wiped so late outcomes are ignored
+        self._prefs_epoch = 0
+        # Labels whose prefs file has been read (see _ensure_cmd_state)
+        self._loaded_labels: set = set()
+        # `<cmd> -h` text per command name, and the help runs in flight
+        self._help_cache: Dict[str, str] = {}
+        self._help_inflight: set = set()
+        self._help_worker: Optional[ThreadPoolExecutor] = None
 
         # Paths
         self.repo_dir = os.path.dirname(__file__)
         self.trade_py = os.path.join(self.repo_dir, "trade.py")
+        # Child environment, copied from os.environ once (never mutated)
+        self._subprocess_env: Dict[str, str] = {**os.environ, "PYTHONIOENCODING": "UTF-8"}
 
         # Build UI
         self._build_topbar()
@@ -258,10 +568,7 @@ class TdGuiApp(tk.Tk):
 
     # ----- Platform helpers -----
     def _is_windows(self) -> bool:
-        try:
-            return sys.platform.startswith('win')
-        except Exception:
-            return False
+        return _IS_WIN
 
     def _is_macos(self) -> bool:
         try:
@@ -302,7 +609,10 @@ class TdGuiApp(tk.Tk):
         """Return command labels with preferred presets first.
         Order: Update/Rebuild DB, Update Live Listings, EDDN Live presets, Spansh import, then the rest sorted.
         """
-        keys = list(self.cmd_metas.keys())
+        # cmd_metas is loaded once at startup, so the ordering is computed once
+        cached = getattr(self, '_ordered_labels', None)
+        if cached is not None:
+            return cached
         preferred = [
             "Update All (DB + Live Listings)",
             "Update/Rebuild DB",
@@ -311,9 +621,11 @@ class TdGuiApp(tk.Tk):
             "EDDN Live (All Markets)",
             "Import Spansh Galaxy",
         ]
-        head = [k for k in preferred if k in keys]
-        tail = sorted([k for k in keys if k not in head])
-        return head + tail
+        head = [k for k in preferred if k in self.cmd_metas]
+        pref_set = set(head)
+        tail = sorted(k for k in self.cmd_metas if k not in pref_set)
+        self._ordered_labels = head + tail
+        return self._ordered_labels
 
     # ----- Top bar -----
     def _build_topbar(self):
@@ -329,7 +641,7 @@ class TdGuiApp(tk.Tk):
         # then clamp to a compact range so it doesn't dominate the toolbar.
         _labels = self._ordered_command_labels()
         try:
-            _font = tkfont.nametofont("TkDefaultFont")
+            _font = self._ui_font
             _max_px = max((_font.measure(s) for s in _labels), default=160)
             _avg_px = max(1, _font.measure("0"))
             _pad_px = _font.measure("   ") + 24  # entry padding + dropdown arrow
@@ -363,14 +675,9 @@ class TdGuiApp(tk.Tk):
         self.preview_var = tk.StringVar()
         self.preview_entry = ttk.Entry(prev, textvariable=self.preview_var)
         self.preview_entry.grid(row=0, column=1, sticky="ew", padx=(6,6))
-        # Make insertion cursor white in the preview box
-        try:
-            self.preview_entry.configure(insertbackground=self.colors["fg"])
-        except Exception:
-            pass
-        copy_btn = ttk.Button(prev, text="Copy", command=self._copy_preview, style="Secondary.TButton")
+        copy_btn = ttk.Button(prev, text="Copy", command=self._copy_preview, style=self._ensure_style("Secondary.TButton"))
         copy_btn.grid(row=0, column=2, sticky="ew", padx=(0,6))
-        self.run_btn = ttk.Button(prev, text="Run", command=self._run, style="Accent.TButton")
+        self.run_btn = ttk.Button(prev, text="Run", command=self._run, style=self._ensure_style("Accent.TButton"))
         self.run_btn.grid(row=0, column=3, sticky="ew", padx=(0,6))
         reset_btn = ttk.Button(prev, text="Reset", command=self._reset_defaults)
         reset_btn.grid(row=0, column=4, sticky="ew")
@@ -391,15 +698,20 @@ class TdGuiApp(tk.Tk):
         left_container.columnconfigure(0, weight=1)
         self.main_pane.add(left_container, weight=1)
         
-        self.selector_canvas = tk.Canvas(left_container, highlightthickness=0, bg=self.colors["bg"], bd=0)
+        self.selector_canvas = tk.Canvas(left_container, highlightthickness=0, bg=COLORS.bg, bd=0)
         self.selector_scroll = ttk.Scrollbar(left_container, orient=tk.VERTICAL, command=self.selector_canvas.yview)
         self.selector_frame = ttk.Frame(self.selector_canvas)
         self.selector_frame.bind(
             "<Configure>",
             lambda e: self.selector_canvas.configure(scrollregion=self.selector_canvas.bbox("all"))
         )
-        self.selector_canvas.create_window((0,0), window=self.selector_frame, anchor="nw")
-        self.selector_canvas.configure(yscrollcommand=self.selector_scroll.set)
+        self._selector_window = self.selector_canvas.create_window((0,0), window=self.selector_frame, anchor="nw")
+        # The selector frame fills the viewport; each form's Treeview scrolls
+        # itself so only the visible option rows are drawn, and drives the
+        # scrollbar (see _attach_selector_scroll)
+        self.selector_frame.rowconfigure(0, weight=1)
+        self.selector_frame.columnconfigure(0, weight=1)
+        self.selector_canvas.bind("<Configure>", self._on_selector_canvas_configure)
         self.selector_canvas.grid(row=0, column=0, sticky="nsew")
         self.selector_scroll.grid(row=0, column=1, sticky="ns")
         # Wheel on selector area
@@ -424,23 +736,20 @@ class TdGuiApp(tk.Tk):
             pass
 
         # Vertical splitter between selected options (top) and output/help (bottom)
-        self.right_split = ttk.Panedwindow(right_container, orient=tk.VERTICAL, style="RightSplit.TPanedwindow")
+        self.right_split = ttk.Panedwindow(right_container, orient=tk.VERTICAL, style=self._ensure_style("RightSplit.TPanedwindow"))
         self.right_split.grid(row=0, column=0, sticky="nsew")
-        try:
-            self.right_split.configure(sashwidth=6)
-        except Exception:
-            pass
 
         self.selected_frame = ttk.LabelFrame(self.right_split, text="Selected Options")
         self.selected_frame.columnconfigure(1, weight=1)
         self.selected_frame.rowconfigure(0, weight=1)
 
         # Make selected options scrollable as well
-        self.sel_canvas = tk.Canvas(self.selected_frame, highlightthickness=0, height=200, bg=self.colors["bg"], bd=0)
+        self.sel_canvas = tk.Canvas(self.selected_frame, highlightthickness=0, height=200, bg=COLORS.bg, bd=0)
         self.sel_scroll = ttk.Scrollbar(self.selected_frame, orient=tk.VERTICAL, command=self.sel_canvas.yview)
         self.sel_inner = ttk.Frame(self.sel_canvas)
+        self.sel_inner.columnconfigure(0, weight=1)
         # Track help labels for dynamic wrap updates
-        self._help_labels: List[ttk.Label] = []
+        self._help_labels: set = set()
         # Update scrollregion and help label wrap lengths on size changes
         self.sel_inner.bind("<Configure>", self._on_sel_inner_configure)
         self.sel_canvas.create_window((0,0), window=self.sel_inner, anchor="nw")
@@ -481,7 +790,7 @@ class TdGuiApp(tk.Tk):
         # Status line above output
         self.run_status_var = tk.StringVar(value="")
         # Stop button (red with white text) to the left of the timer
-        self.stop_btn = ttk.Button(self.status_row, text="Stop", command=self._stop_run, style="Stop.TButton")
+        self.stop_btn = ttk.Button(self.status_row, text="Stop", command=self._stop_run, style=self._ensure_style("Stop.TButton"))
         # Hidden by default until a run starts
         try:
             self.stop_btn.state(["disabled"])
@@ -494,7 +803,7 @@ class TdGuiApp(tk.Tk):
         self.run_progress = ttk.Progressbar(
             self.status_row,
             mode="indeterminate",
-            style="Loading.Horizontal.TProgressbar",
+            style=self._ensure_style("Loading.Horizontal.TProgressbar"),
             length=180,
         )
         # Place but hide until a run starts
@@ -504,12 +813,8 @@ class TdGuiApp(tk.Tk):
         except Exception:
             pass
         # Vertical splitter exactly between route cards and console output
-        self.out_split = ttk.Panedwindow(out_tab, orient=tk.VERTICAL, style="OutSplit.TPanedwindow")
+        self.out_split = ttk.Panedwindow(out_tab, orient=tk.VERTICAL, style=self._ensure_style("OutSplit.TPanedwindow"))
         self.out_split.grid(row=1, column=0, sticky="nsew")
-        try:
-            self.out_split.configure(sashwidth=6)
-        except Exception:
-            pass
         # Top: route cards container (populated when parsing 'run' output)
         routes_panel = ttk.Frame(self.out_split)
         routes_panel.columnconfigure(0, weight=1)
@@ -517,6 +822,8 @@ class TdGuiApp(tk.Tk):
         self.routes_frame.grid(row=0, column=0, sticky="ew", padx=4, pady=(2,4))
         self.routes_frame.columnconfigure(0, weight=1)
         self._route_cards: List[Dict[str, Any]] = []
+        # Card widgets are kept and re-used across runs; see _route_card
+        self._route_card_pool: List[Dict[str, Any]] = []
         try:
             self.out_split.add(routes_panel, weight=1)
         except Exception:
@@ -584,30 +891,18 @@ class TdGuiApp(tk.Tk):
         self.cwd_var = tk.StringVar()
         _cwd_entry = ttk.Entry(bottom, textvariable=self.cwd_var)
         _cwd_entry.grid(row=0, column=1, sticky="ew", padx=(0,6))
-        try:
-            _cwd_entry.configure(insertbackground=self.colors["fg"])
-        except Exception:
-            pass
         ttk.Button(bottom, text="Browse...", command=self._browse_cwd).grid(row=0, column=2, sticky="e")
         # DB
         ttk.Label(bottom, text="DB:").grid(row=1, column=0, sticky="w", padx=6, pady=3)
         self.db_var = tk.StringVar()
         _db_entry = ttk.Entry(bottom, textvariable=self.db_var)
         _db_entry.grid(row=1, column=1, sticky="ew", padx=(0,6))
-        try:
-            _db_entry.configure(insertbackground=self.colors["fg"])
-        except Exception:
-            pass
         ttk.Button(bottom, text="Browse...", command=self._browse_db).grid(row=1, column=2, sticky="e")
         # Link-Ly
         ttk.Label(bottom, text="Link-Ly:").grid(row=2, column=0, sticky="w", padx=6, pady=3)
         self.linkly_var = tk.StringVar()
         _ll_entry = ttk.Entry(bottom, textvariable=self.linkly_var)
         _ll_entry.grid(row=2, column=1, sticky="ew", padx=(0,6))
-        try:
-            _ll_entry.configure(insertbackground=self.colors["fg"])
-        except Exception:
-            pass
 
         # Detail / Quiet / Debug counters on the right
         ttk.Label(bottom, text="Detail:").grid(row=0, column=6, sticky="e")
@@ -633,10 +928,6 @@ class TdGuiApp(tk.Tk):
         self.autobackup_name_var = tk.StringVar(value="")
         self.autobackup_entry = ttk.Entry(bottom, textvariable=self.autobackup_name_var, width=18)
         self.autobackup_entry.grid(row=0, column=11, sticky="w", padx=(4,0))
-        try:
-            self.autobackup_entry.configure(insertbackground=self.colors["fg"])
-        except Exception:
-            pass
         # Disabled by default unless checkbox is on
         try:
             self.autobackup_entry.state(["disabled"])  # type: ignore[attr-defined]
@@ -646,20 +937,24 @@ class TdGuiApp(tk.Tk):
             except Exception:
                 pass
 
-        # Trace to update preview when globals change
-        self.cwd_var.trace_add("write", lambda *_: self._update_preview())
-        self.db_var.trace_add("write", lambda *_: self._update_preview())
-        self.linkly_var.trace_add("write", lambda *_: self._update_preview())
+        # Trace to update preview when globals change (coalesced per edit burst)
+        self.cwd_var.trace_add("write", lambda *_: self._schedule_preview())
+        self.db_var.trace_add("write", lambda *_: self._schedule_preview())
+        self.linkly_var.trace_add("write", lambda *_: self._schedule_preview())
 
         # Also persist on change
-        self.cwd_var.trace_add("write", lambda *_: self._save_prefs())
-        self.db_var.trace_add("write", lambda *_: self._save_prefs())
-        self.linkly_var.trace_add("write", lambda *_: self._save_prefs())
-        self.detail_var.trace_add("write", lambda *_: self._save_prefs())
-        self.quiet_var.trace_add("write", lambda *_: self._save_prefs())
-        self.debug_var.trace_add("write", lambda *_: self._save_prefs())
-        self.autobackup_var.trace_add("write", lambda *_: self._save_prefs())
-        self.autobackup_name_var.trace_add("write", lambda *_: self._save_prefs())
+        self.cwd_var.trace_add("write", lambda *_: self._schedule_save())
+        self.db_var.trace_add("write", lambda *_: self._schedule_save())
+        self.linkly_var.trace_add("write", lambda *_: self._schedule_save())
+        self.detail_var.trace_add("write", lambda *_: self._schedule_save())
+        self.quiet_var.trace_add("write", lambda *_: self._schedule_save())
+        self.debug_var.trace_add("write", lambda *_: self._schedule_save())
+        # -v/-q/-w switches are rebuilt only when a level changes
+        for var in (self.detail_var, self.quiet_var, self.debug_var):
+            var.trace_add("write", lambda *_: self._update_verbosity_parts())
+        self._update_verbosity_parts()
+        self.autobackup_var.trace_add("write", lambda *_: self._schedule_save())
+        self.autobackup_name_var.trace_add("write", lambda *_: self._schedule_save())
 
     def _init_sashes(self):
         # Set initial sash positions once, unless the user already moved them
@@ -690,15 +985,59 @@ class TdGuiApp(tk.Tk):
                 pass
         self._sashes_initialized = True
 
-    def _clear_option_frames(self):
-        # Clear selector and selected entries
-        for child in self.selector_frame.winfo_children():
-            child.destroy()
-        for child in self.sel_inner.winfo_children():
-            child.destroy()
-        self.widget_vars.clear()
-        # Also keep a selection map
-        self._selected: Dict[OptionSpec, Dict[str, Any]] = {}
+    def _show_command_form(self, name: str) -> bool:
+        """Hide the visible option forms and show the cached ones for the given
+        command label, creating empty forms on first use. Returns True when the
+        forms were just created and still need populating.
+        """
+        if self._form is not None:
+            self._form['selector'].grid_remove()
+            self._form['editor'].grid_remove()
+        created = False
+        form = self._cmd_forms.get(name)
+        if form is None:
+            form = {
+                'selector': ttk.Frame(self.selector_frame),
+                'editor': ttk.Frame(self.sel_inner),
+                'rows': {},
+                'selected': {},
+                # Help labels evict themselves on <Destroy>
+                'help_labels': set(),
+                # wraplength last applied to help_labels (-1: re-apply)
+                'wrap': -1,
+            }
+            form['editor'].columnconfigure(1, weight=1)
+            self._bind_mousewheel_target(form['selector'], target=self.selector_canvas)
+            self._bind_mousewheel_target(form['editor'], target=self.sel_canvas)
+            self._cmd_forms[name] = form
+            created = True
+        form['selector'].grid(row=0, column=0, sticky="nsew")
+        form['editor'].grid(row=0, column=0, sticky="nsew")
+        self._form = form
+        self._rows = form['rows']
+        self._selected = form['selected']
+        self._help_labels = form['help_labels']
+        self._attach_selector_scroll()
+        if not created:
+            # Re-wrap help text in case the panel was resized while hidden
+            self._on_sel_inner_configure()
+        return created
+
+    def _discard_command_forms(self, label: Optional[str] = None):
+        """Destroy cached option forms (all, or a single label) so they are
+        rebuilt from saved preferences the next time they are shown."""
+        labels = [label] if label is not None else list(self._cmd_forms)
+        for lb in labels:
+            form = self._cmd_forms.pop(lb, None)
+            if not form:
+                continue
+            for key in ('selector', 'editor'):
+                try:
+                    form[key].destroy()
+                except Exception:
+                    pass
+            if form is self._form:
+                self._form = None
 
     # ----- Populate dynamic forms -----
     def _on_command_change(self):
@@ -710,85 +1049,166 @@ class TdGuiApp(tk.Tk):
         except Exception:
             pass
         name = self.cmd_var.get()
+        self._ensure_cmd_state(name)
         self.current_meta = self.cmd_metas.get(name)
-        self._clear_option_frames()
+        built = self._show_command_form(name)
         if not self.current_meta:
             return
+        if 'by_dest' not in self._form:
+            # Spec lookups by dest / long flag (first spec wins, in form order)
+            by_dest: Dict[str, OptionSpec] = {}
+            by_long: Dict[str, OptionSpec] = {}
+            for spec in (*self.current_meta.arguments, *self.current_meta.switches):
+                if spec.dest:
+                    by_dest.setdefault(spec.dest, spec)
+                by_long.setdefault(spec.long_flag, spec)
+            self._form['by_dest'], self._form['by_long'] = by_dest, by_long
+        # Apply saved values for this command, if any; a cached form already
+        # holds its options as left, so only the shared widgets need restoring
+        with self._bulk_layout(self._form['editor']):
+            if built:
+                self._build_command_form()
+            self._apply_saved_state_for_current(include_options=built)
+        # Preserve saved preview if available; otherwise compute fresh preview
+        try:
+            data = getattr(self, '_prefs', {}) or {}
+            saved = (data.get('commands', {}) or {}).get(name, {})
+            pv = saved.get('preview')
+            if isinstance(pv, str) and pv:
+                self._cancel_preview()
+                self.preview_var.set(pv)
+            else:
+                self._update_preview()
+        except Exception:
+            self._update_preview()
+        self._schedule_save()
+        # Track which command the UI currently represents
+        self._current_cmd_label = name
 
+    def _build_command_form(self):
         # (removed: Add via Command toggle)
 
-        # Build left selector groups and pre-select required args
+        # Build left selector groups and pre-select required args. One Treeview
+        # holds every group/option row (checkbox drawn as the item image)
+        # instead of a LabelFrame + Checkbutton + Label per option.
         groups = self._categorize_current()
-        row = 0
+        imgs = self._check_imgs
+        sel = self._form['selector']
+        sel.rowconfigure(0, weight=1)
+        sel.columnconfigure(0, weight=1)
+        tree = ttk.Treeview(sel, show="tree", selectmode="none", style=self._ensure_style("Selector.Treeview"), height=1)
+        tree.tag_configure("required", foreground=COLORS.muted)
+        items: Dict[str, OptionSpec] = {}
+        texts: List[str] = []
         for group_name, specs in groups:
-            lf = ttk.LabelFrame(self.selector_frame, text=group_name)
-            lf.grid(row=row, column=0, sticky="ew", padx=4, pady=4)
-            lf.columnconfigure(1, weight=1)
-            r = 0
+            gid = tree.insert("", "end", text=group_name, open=True)
+            texts.append(group_name)
             for spec in specs:
-                # Required args are in current_meta.arguments
+                # Required args are in current_meta.arguments; always selected
                 is_required = spec in self.current_meta.arguments
-                var = tk.BooleanVar(value=is_required and not spec.is_flag or is_required)
-                cb = ttk.Checkbutton(lf, variable=var)
-                cb.grid(row=r, column=0, sticky="w")
-                if is_required:
-                    cb.state(["disabled"])  # Always selected
-                ttk.Label(lf, text=spec.display_name).grid(row=r, column=1, sticky="w")
+                var = tk.BooleanVar(value=is_required)
+                iid = tree.insert(gid, "end", text=spec.display_name,
+                                  image=imgs["required" if is_required else "off"],
+                                  tags=("required",) if is_required else ())
+                items[iid] = spec
+                texts.append(spec.display_name)
                 # Keep ref
-                self.widget_vars.setdefault(spec, {})["selected"] = var
-                # Bind
-                def make_cb(s=spec, v=var):
-                    return lambda *_: (self._on_toggle_option(s, v.get()), self._save_prefs())
+                self._rows[spec] = RowState(var, (spec.display_name, spec.is_flag, spec.is_positional, spec.multiple))
+                # Bind: keep the row image in sync with the var, however it is set
+                def make_cb(s=spec, v=var, i=iid, req=is_required):
+                    def _cb(*_):
+                        if not req:
+                            tree.item(i, image=imgs["on" if v.get() else "off"])
+                        self._on_toggle_option(s, v.get())
+                        self._schedule_save()
+                    return _cb
                 var.trace_add("write", make_cb())
                 # If pre-selected (required), add to editor panel
                 if var.get():
                     self._ensure_selected_row(spec)
-                r += 1
-            row += 1
+        # The tree is sized to the viewport and scrolls itself, so Tk only
+        # lays out and draws the rows currently in view
+        try:
+            f = self._ui_font
+            width = max((f.measure(t) for t in texts), default=160) + 60
+            tree.column("#0", width=width, minwidth=width, stretch=True)
+        except Exception:
+            pass
+        tree.configure(yscrollcommand=lambda first, last, t=tree: self._on_selector_tree_yscroll(t, first, last))
+        tree.grid(row=0, column=0, sticky="nsew", padx=4, pady=4)
+        tree.bind("<Button-1>", self._on_selector_click)
+        tree.bind("<space>", self._on_selector_key)
+        self._bind_mousewheel_target(tree)
+        self._form['tree'] = tree
+        self._form['tree_items'] = items
+        self._attach_selector_scroll()
 
         # For buildcache, default -i and -f to selected (user can uncheck)
         try:
             if self.current_meta.name == 'buildcache':
-                for spec, vars_ in list(self.widget_vars.items()):
-                    if not isinstance(spec, OptionSpec):
-                        continue
-                    longflag = spec.long_flag
-                    if longflag in ('--ignore-unknown', '--force'):
-                        sv = vars_.get('selected')
-                        if isinstance(sv, tk.BooleanVar) and not sv.get():
-                            sv.set(True)
+                for spec, rs in list(self._rows.items()):
+                    if spec.long_flag in ('--ignore-unknown', '--force') and not rs.selected.get():
+                        rs.selected.set(True)
         except Exception:
             pass
 
-        # Apply saved values for this command, if any
-        self._apply_saved_state_for_current()
-        # Preserve saved preview if available; otherwise compute fresh preview
+    def _on_selector_canvas_configure(self, event):
+        # Keep the selector frame exactly viewport-sized
         try:
-            data = getattr(self, '_prefs', {}) or {}
-            saved = (data.get('commands', {}) or {}).get(name, {})
-            pv = saved.get('preview')
-            if isinstance(pv, str) and pv:
-                self.preview_var.set(pv)
+            self.selector_canvas.itemconfigure(self._selector_window, width=event.width, height=event.height)
+        except Exception:
+            pass
+
+    def _attach_selector_scroll(self):
+        # Point the selector scrollbar at the visible form's tree
+        tree = (self._form or {}).get('tree')
+        try:
+            if tree is None:
+                self.selector_scroll.configure(command=self.selector_canvas.yview)
+                self.selector_scroll.set(0.0, 1.0)
             else:
-                self._update_preview()
+                self.selector_scroll.configure(command=tree.yview)
+                self.selector_scroll.set(*tree.yview())
         except Exception:
-            self._update_preview()
-        self._save_prefs()
-        # Track which command the UI currently represents
-        self._current_cmd_label = name
+            pass
+
+    def _on_selector_tree_yscroll(self, tree, first, last):
+        # Hidden forms' trees may still report; only the visible one drives the bar
+        self._note_overflow(tree, first, last)
+        if (self._form or {}).get('tree') is tree:
+            self.selector_scroll.set(first, last)
+
+    def _toggle_selector_item(self, iid: str):
+        spec = (self._form or {}).get('tree_items', {}).get(iid)
+        if spec is None or spec in self.current_meta.arguments:
+            return
+        rs = self._rows.get(spec)
+        if rs is not None:
+            rs.selected.set(not rs.selected.get())
+
+    def _on_selector_click(self, ev):
+        tree = ev.widget
+        iid = tree.identify_row(ev.y)
+        if not iid or iid not in (self._form or {}).get('tree_items', {}):
+            return None  # group rows keep their default open/close handling
+        tree.focus(iid)
+        self._toggle_selector_item(iid)
+        return "break"
+
+    def _on_selector_key(self, ev):
+        iid = ev.widget.focus()
+        if iid:
+            self._toggle_selector_item(iid)
+        return "break"
 
     def _on_toggle_option(self, spec: OptionSpec, selected: bool):
         # enforce mutual exclusion if needed
         if selected and spec.group_id is not None:
             # Unselect other specs from the same group
-            for other, vars_ in list(self.widget_vars.items()):
-                if other is spec:
-                    continue
-                if isinstance(other, OptionSpec) and other.group_id == spec.group_id:
-                    sv = vars_.get("selected")
-                    if isinstance(sv, tk.BooleanVar) and sv.get():
-                        sv.set(False)
-                        # row will be removed in recursive call
+            for other, rs in list(self._rows.items()):
+                if other is not spec and other.group_id == spec.group_id and rs.selected.get():
+                    rs.selected.set(False)
+                    # row will be removed in recursive call
         # Show/remove from editor
         if selected:
             self._ensure_selected_row(spec)
@@ -799,118 +1219,129 @@ class TdGuiApp(tk.Tk):
     def _ensure_selected_row(self, spec: OptionSpec):
         if spec in self._selected:
             return
+        rs = self._rows.get(spec)
+        if rs is None:
+            rs = self._rows[spec] = RowState(tk.BooleanVar(value=True), (spec.display_name, spec.is_flag, spec.is_positional, spec.multiple))
         row = len(self._selected)
-        lbl = ttk.Label(self.sel_inner, text=spec.display_name + ":")
+        parent = self._form['editor']
+        lbl = ttk.Label(parent, text=spec.display_name + ":")
         lbl.grid(row=row*2, column=0, sticky="w", padx=6, pady=(6,0))
-        # For flags, show a checked indicator but no input
+        # For flags, show a checked indicator but no input: a plain Label with
+        # the shared checkbox images rather than a ttk.Checkbutton per row
         if spec.is_flag:
+            imgs = self._check_imgs
             val_var = tk.BooleanVar(value=True)
-            chk = ttk.Checkbutton(self.sel_inner, variable=val_var)
+            chk = tk.Label(parent, image=imgs["on"], bg=COLORS.bg, bd=0, takefocus=1)
             chk.grid(row=row*2, column=1, sticky="w", padx=6, pady=(6,0))
-            val_var.trace_add("write", lambda *_: (self._update_preview(), self._save_prefs()))
-            help_lbl = None
-            widgets = {"flag": val_var, "row": row}
+            def _flip(_e=None, v=val_var):
+                v.set(not v.get())
+                return "break"
+            chk.bind("<Button-1>", _flip)
+            chk.bind("<space>", _flip)
+            def _on_flag(*_, w=chk, v=val_var):
+                w.configure(image=imgs["on" if v.get() else "off"])
+                self._schedule_preview()
+                self._schedule_save()
+            val_var.trace_add("write", _on_flag)
+            widgets = (lbl, chk, None)
         else:
             val_var = tk.StringVar()
-            entry = ttk.Entry(self.sel_inner, textvariable=val_var)
+            entry = ttk.Entry(parent, textvariable=val_var)
             entry.grid(row=row*2, column=1, sticky="ew", padx=6, pady=(6,0))
-            try:
-                entry.configure(insertbackground=self.colors["fg"])
-            except Exception:
-                pass
-            self.sel_inner.columnconfigure(1, weight=1)
             if spec.default not in (None, False):
                 entry.insert(0, str(spec.default))
-            val_var.trace_add("write", lambda *_: (self._update_preview(), self._save_prefs()))
+            val_var.trace_add("write", lambda *_: (self._schedule_preview(), self._schedule_save()))
             help_lbl = None
             if spec.help:
                 help_lbl = ttk.Label(
-                    self.sel_inner,
+                    parent,
                     text=spec.help,
-                    foreground=self.colors["muted"],
+                    foreground=COLORS.muted,
                     justify="left",
                     wraplength=max(300, self.sel_canvas.winfo_width() - 20 if self.sel_canvas.winfo_width() else 600),
                 )
                 help_lbl.grid(row=row*2+1, column=0, columnspan=2, sticky="ew", padx=6)
-                self._help_labels.append(help_lbl)
-            widgets = {"value": val_var, "row": row, "help": help_lbl}
-        self._selected[spec] = widgets
+                labels = self._help_labels
+                labels.add(help_lbl)
+                help_lbl.bind("<Destroy>", lambda e, w=help_lbl, s=labels: s.discard(w))
+                if self._form is not None:
+                    self._form['wrap'] = -1
+            widgets = (lbl, entry, help_lbl)
+        rs.value, rs.widgets, rs.row = val_var, widgets, row
+        self._selected[spec] = rs
 
     def _remove_selected_row(self, spec: OptionSpec):
-        widgets = self._selected.pop(spec, None)
-        if not widgets:
+        rs = self._selected.pop(spec, None)
+        if rs is None:
             return
-        # Destroy row widgets: find widgets in the row (labels/entries)
-        for w in list(self.sel_inner.grid_slaves()):
-            info = w.grid_info()
-            # Each row occupies two grid rows: row*2 and row*2+1
-            if info.get("row") in (widgets.get("row", -1)*2, widgets.get("row", -1)*2 + 1):
+        # Destroy this row's widgets (label, input, help)
+        for w in rs.widgets:
+            if w is not None:
                 w.destroy()
-        # Re-pack remaining rows
-        for i, (s, wd) in enumerate(list(self._selected.items())):
-            # Move to new row index i
-            target_r0 = i*2
-            # Find row of label of s
-            for w in self.sel_inner.grid_slaves():
-                inf = w.grid_info()
-                if inf.get("row") == wd.get("row")*2:
-                    w.grid(row=target_r0, column=inf.get("column"))
-                elif inf.get("row") == wd.get("row")*2 + 1:
-                    w.grid(row=target_r0+1, column=inf.get("column"))
-            wd["row"] = i
-        # Also purge from help label tracker
-        try:
-            hl = widgets.get("help")
-            if hl in self._help_labels:
-                self._help_labels.remove(hl)
-        except Exception:
-            pass
-        self._save_prefs()
+        rs.value, rs.widgets, rs.row = None, (), -1
+        # Re-pack remaining rows in order; each occupies grid rows i*2 and i*2+1
+        for i, other in enumerate(self._selected.values()):
+            if other.row != i:
+                for w, subrow in zip(other.widgets, (0, 0, 1)):
+                    if w is not None:
+                        w.grid_configure(row=i*2 + subrow)
+                other.row = i
+        self._schedule_save()
 
     # ----- Build args and preview -----
     def _build_args(self) -> List[str]:
         if not self.current_meta:
             return []
+        # Memoized on everything the result depends on (each var read once):
+        # command, selected rows in order with their values, and the globals
+        rows = tuple(self._selected.values())
+        vals = tuple(rs.value.get() for rs in rows)
+        cwd, db, linkly = self.cwd_var.get().strip(), self.db_var.get().strip(), self.linkly_var.get().strip()
+        verbosity = self._verbosity_parts
+        key = (id(self.current_meta), tuple(map(id, rows)), vals, cwd, db, linkly, verbosity)
+        if key == self._args_cache_key:
+            return list(self._args_cache)
         # If this meta defines fixed args, use them verbatim
         if getattr(self.current_meta, "fixed_args", None):
             parts: List[str] = list(self.current_meta.fixed_args)  # includes subcommand
         else:
             parts: List[str] = [self.current_meta.name]
 
-        # Selected options (right panel)
-        for spec, wd in self._selected.items():
-            if spec.is_flag:
-                if wd.get("flag").get():
-                    parts.append(spec.display_name)
+        # Selected options (right panel), in row order; only the live var
+        # values are read here, the rest comes from each row's plan
+        for rs, val in zip(rows, vals):
+            name, is_flag, is_positional, multiple = rs.plan
+            if is_flag:
+                if val:
+                    parts.append(name)
             else:
-                val = wd.get("value").get().strip()
+                val = val.strip()
                 if val != "":
                     # For positional required arguments, emit only the value
-                    if spec.is_positional:
+                    if is_positional:
                         parts.append(val)
                     # Support comma-separated values for append-type options
-                    elif spec.multiple and "," in val:
+                    elif multiple and "," in val:
                         for v in [x.strip() for x in val.split(',') if x.strip()]:
-                            parts.extend([spec.display_name, v])
+                            parts.extend([name, v])
                     else:
-                        parts.extend([spec.display_name, val])
+                        parts.extend([name, val])
 
         # Global/common switches
         # cwd (-C)
-        if self.cwd_var.get().strip():
-            parts.extend(["-C", self.cwd_var.get().strip()])
+        if cwd:
+            parts.extend(["-C", cwd])
         # db
-        if self.db_var.get().strip():
-            parts.extend(["--db", self.db_var.get().strip()])
+        if db:
+            parts.extend(["--db", db])
         # link-ly (-L)
-        if self.linkly_var.get().strip():
-            parts.extend(["-L", self.linkly_var.get().strip()])
+        if linkly:
+            parts.extend(["-L", linkly])
         # detail (-v), quiet (-q), debug (-w)
-        parts.extend(["-v"] * int(self.detail_var.get()))
-        parts.extend(["-q"] * int(self.quiet_var.get()))
-        parts.extend(["-w"] * int(self.debug_var.get()))
+        parts += verbosity
 
-        return parts
+        self._args_cache_key, self._args_cache = key, parts
+        return list(parts)
 
     def _build_args_from_base(self, base: List[str]) -> List[str]:
         """Build CLI args starting from a provided base (e.g., a preset),
@@ -922,11 +1353,17 @@ class TdGuiApp(tk.Tk):
             parts.extend(["--db", self.db_var.get().strip()])
         if self.linkly_var.get().strip():
             parts.extend(["-L", self.linkly_var.get().strip()])
-        parts.extend(["-v"] * int(self.detail_var.get()))
-        parts.extend(["-q"] * int(self.quiet_var.get()))
-        parts.extend(["-w"] * int(self.debug_var.get()))
+        parts += self._verbosity_parts
         return parts
 
+    def _update_verbosity_parts(self):
+        try:
+            levels = (int(self.detail_var.get()), int(self.quiet_var.get()), int(self.debug_var.get()))
+        except Exception:
+            # Half-typed spinbox value: keep the last valid switches
+            return
+        self._verbosity_parts = ("-v",) * levels[0] + ("-q",) * levels[1] + ("-w",) * levels[2]
+
     def _update_preview(self):
         label = self.cmd_var.get()
         # Special combined preset: show both steps in preview
@@ -941,27 +1378,59 @@ class TdGuiApp(tk.Tk):
             args = self._build_args()
             # Render a shell-like preview
             parts = [sys.executable, self.trade_py] + args
-        def quote_double(s: str) -> str:
-            s = str(s)
-            if s is None:
-                s = ""
-            # For preview: trim leading/trailing whitespace
-            s = s.strip()
-            needs_quotes = (s == "" or any(ch.isspace() for ch in s) or "/" in s)
-            if needs_quotes:
-                return '"' + s.replace('"', '\\"') + '"'
-            return s
-        self.preview_var.set(" ".join(quote_double(p) for p in parts))
+        # Re-quote and re-set the preview only when the argv actually changed
+        # (and the entry still shows what was rendered last, i.e. no saved
+        # preview was restored over it since)
+        pkey = (label, tuple(parts))
+        if pkey == self._preview_key and self.preview_var.get() == self._preview_text:
+            return
+        self._preview_key = pkey
+        self._preview_text = text = " ".join(map(_quote_preview_arg, parts))
+        # StringVar.set fires its write traces and redraws the entry even for
+        # an identical value
+        if text != self.preview_var.get():
+            self.preview_var.set(text)
 
     # ----- Layout helpers -----
+    @contextmanager
+    def _bulk_layout(self, frame):
+        """Add many rows to frame with geometry propagation off, so the editor
+        panel is resized (and help labels re-wrapped) once at the end instead
+        of after every row. Re-entrant."""
+        depth = getattr(self, '_bulk_depth', 0)
+        self._bulk_depth = depth + 1
+        if depth == 0:
+            try:
+                frame.grid_propagate(False)
+            except Exception:
+                pass
+        try:
+            yield frame
+        finally:
+            self._bulk_depth = depth
+            if depth == 0:
+                try:
+                    frame.grid_propagate(True)
+                except Exception:
+                    pass
+                self._on_sel_inner_configure()
+
     def _on_sel_inner_configure(self, event=None):
         # Maintain scrollregion and re-wrap help labels to available width
+        if getattr(self, '_bulk_depth', 0):
+            return
         try:
             self.sel_canvas.configure(scrollregion=self.sel_canvas.bbox("all"))
         except Exception:
             pass
         try:
             wrap = max(300, self.sel_canvas.winfo_width() - 20)
+            # Scroll/resize jitter mostly leaves the width alone
+            form = self._form
+            if form is not None:
+                if form.get('wrap') == wrap:
+                    return
+                form['wrap'] = wrap
             for lbl in list(self._help_labels):
                 try:
                     lbl.configure(wraplength=wrap)
@@ -973,6 +1442,7 @@ class TdGuiApp(tk.Tk):
     # ----- Running the command -----
     def _run(self):
         self.output.delete("1.0", tk.END)
+        self._reset_raw_output()
         self._start_timer()
         self._clear_routes()
         self._stop_requested = False
@@ -1023,23 +1493,23 @@ class TdGuiApp(tk.Tk):
         def reader(preempted_sessions=preempted):
             try:
                 # Start child in its own process group so we can signal it
+                # Binary pipe read in large chunks (see below) rather than a
+                # line-buffered text wrapper
                 popen_kwargs = dict(
                     cwd=self.repo_dir,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                    bufsize=1,
-                    env={**os.environ, "PYTHONIOENCODING": "UTF-8"},
+                    bufsize=-1,
+                    env=self._subprocess_env,
                 )
-                if sys.platform.startswith('win'):
+                if _IS_WIN:
                     try:
                         popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
                     except Exception:
                         pass
                 else:
                     try:
-                        import os as _os
-                        popen_kwargs["preexec_fn"] = _os.setsid
+                        popen_kwargs["preexec_fn"] = os.setsid
                     except Exception:
                         pass
 
@@ -1063,25 +1533,28 @@ class TdGuiApp(tk.Tk):
 
             if is_progress:
                 self._init_stream_state(self.output)
-                try:
-                    with proc.stdout:
-                        while True:
-                            ch = proc.stdout.read(1)
-                            if ch == '' and proc.poll() is not None:
-                                break
-                            if not ch:
-                                time.sleep(0.05)
-                                continue
-                            self._feed_stream(self.output, ch)
-                except Exception:
-                    pass
+                sink = lambda text: self._feed_stream(self.output, text)
             else:
-                try:
-                    with proc.stdout:
-                        for line in iter(proc.stdout.readline, ''):
-                            self._append_output(line)
-                except Exception:
-                    pass
+                sink = self._append_output
+            # os.read blocks in the kernel until data arrives and returns
+            # whatever is available (up to 64 KiB), b'' only at EOF. Decode
+            # incrementally with the same newline translation text mode used.
+            try:
+                with proc.stdout:
+                    fd = proc.stdout.fileno()
+                    dec = _stream_decoder()
+                    while True:
+                        data = os.read(fd, 65536)
+                        if not data:
+                            break
+                        text = dec.decode(data)
+                        if text:
+                            sink(text)
+                    text = dec.decode(b'', final=True)
+                    if text:
+                        sink(text)
+            except Exception:
+                pass
             rc = proc.wait()
             # Clear proc handle
             self._proc = None
@@ -1111,30 +1584,30 @@ class TdGuiApp(tk.Tk):
             self.run_status_var.set("Stopping...")
         except Exception:
             pass
+        self._signal_proc(proc)
+
+    def _signal_proc(self, proc, hard_after: int = 3000):
+        """Interrupt proc's process group (CTRL_BREAK on Windows, SIGINT
+        elsewhere), then kill it if it is still running after hard_after ms."""
         try:
-            import signal
-            if sys.platform.startswith('win'):
-                try:
-                    proc.send_signal(signal.CTRL_BREAK_EVENT)
-                except Exception:
-                    try:
-                        proc.terminate()
-                    except Exception:
-                        pass
+            if proc is None or proc.poll() is not None:
+                return
+        except Exception:
+            return
+        try:
+            if _IS_WIN:
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
             else:
                 try:
                     os.killpg(os.getpgid(proc.pid), signal.SIGINT)
                 except Exception:
-                    try:
-                        proc.send_signal(signal.SIGINT)
-                    except Exception:
-                        try:
-                            proc.terminate()
-                        except Exception:
-                            pass
+                    proc.send_signal(signal.SIGINT)
         except Exception:
-            pass
-        # Fallback: if still running after a short delay, force kill
+            try:
+                proc.terminate()
+            except Exception:
+                pass
+
         def _ensure_kill(p=proc):
             try:
                 if p.poll() is None:
@@ -1142,43 +1615,19 @@ class TdGuiApp(tk.Tk):
             except Exception:
                 pass
         try:
-            self.after(3000, _ensure_kill)
+            self.after(hard_after, _ensure_kill)
         except Exception:
             pass
 
     # ----- Background sessions (EDDN Live) -----
     def _background_title_for_args(self, full_args: List[str]) -> Optional[str]:
         try:
-            if len(full_args) < 4:
-                return None
-            sub = full_args[2]
-            if sub != 'import':
-                return None
-            argv = full_args[3:]
-            plug = None
-            options_blob = " ".join(argv)
-            for i, a in enumerate(argv):
-                if a in ('-P', '--plug') and i + 1 < len(argv):
-                    plug = argv[i+1].lower()
-                    break
-            if plug == 'eddn':
-                if 'carrier_only' in options_blob or 'public_only' in options_blob:
-                    return 'EDDN Live (Carriers)'
-                return 'EDDN Live (All)'
-            if plug == 'spansh':
-                return 'Import Spansh Galaxy'
-            if plug == 'eddblink':
-                if 'listings_live' in options_blob:
-                    return 'EDDB Link (Live Listings)'
-                return 'EDDB Link Import'
-            return None
+            return _background_title_for_argv(tuple(full_args))
         except Exception:
             return None
 
     def _run_background(self, args: List[str], title_hint: str, resume_after: Optional[List[Dict[str, Any]]] = None, chain: Optional[List[Dict[str, Any]]] = None):
         # Build session tab
-        self._bg_counter += 1
-
         tab = ttk.Frame(self.tabs)
         tab.rowconfigure(0, weight=0)
         tab.rowconfigure(1, weight=1)
@@ -1191,14 +1640,14 @@ class TdGuiApp(tk.Tk):
         status_row.columnconfigure(1, weight=0)
         status_row.columnconfigure(2, weight=1)
         status_var = tk.StringVar(value="Running (00:00)")
-        stop_btn = ttk.Button(status_row, text="Stop", style="Stop.TButton")
+        stop_btn = ttk.Button(status_row, text="Stop", style=self._ensure_style("Stop.TButton"))
         stop_btn.grid(row=0, column=0, sticky="w", padx=(4,6), pady=(2,2))
         ttk.Label(status_row, textvariable=status_var).grid(row=0, column=1, sticky="w", padx=4, pady=(2,2))
         # Indeterminate progress bar for background session
         bg_progress = ttk.Progressbar(
             status_row,
             mode="indeterminate",
-            style="Loading.Horizontal.TProgressbar",
+            style=self._ensure_style("Loading.Horizontal.TProgressbar"),
             length=180,
         )
         try:
@@ -1207,7 +1656,7 @@ class TdGuiApp(tk.Tk):
         except Exception:
             pass
 
-        # Output area tails a log file
+        # Output area shows the child's output (also teed to a log file)
         output = ScrolledText(tab, wrap="word")
         self._style_scrolled_text(output)
         self._enable_copy_shortcuts(output)
@@ -1220,46 +1669,41 @@ class TdGuiApp(tk.Tk):
             os.makedirs(logs_dir, exist_ok=True)
         except Exception:
             logs_dir = self.repo_dir
-        logfile = os.path.join(logs_dir, f"eddn_live_{time.strftime('%Y%m%d_%H%M%S')}_{self._bg_counter}.log")
-
-        # Start background process writing to log
-        env = {**os.environ, "PYTHONIOENCODING": "UTF-8", "PYTHONUNBUFFERED": "1"}
-        _stdout_file = open(logfile, 'w', encoding='utf-8', buffering=1)
-        popen_kwargs = dict(cwd=self.repo_dir, stdout=_stdout_file, stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1, env=env)
-        if sys.platform.startswith('win'):
+        logfile = os.path.join(logs_dir, f"eddn_live_{time.strftime('%Y%m%d_%H%M%S')}_{id(tab):x}.log")
+
+        # Start background process on a pipe; the reader thread tees its
+        # output to the log file and the tab
+        env = {**self._subprocess_env, "PYTHONUNBUFFERED": "1"}
+        # Block-buffered; the reader flushes it about once a second
+        log_fh = open(logfile, 'wb', buffering=65536)
+        popen_kwargs = dict(cwd=self.repo_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1, env=env)
+        if _IS_WIN:
             try:
                 popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
             except Exception:
                 pass
         else:
             try:
-                import os as _os
-                popen_kwargs["preexec_fn"] = _os.setsid
+                popen_kwargs["preexec_fn"] = os.setsid
             except Exception:
                 pass
         try:
             proc = subprocess.Popen(args, **popen_kwargs)
         except Exception as e:
+            log_fh.close()
             self._append_output(f"Failed to start background task: {e}\n")
             return
-        finally:
-            try:
-                _stdout_file.close()
-            except Exception:
-                pass
 
-        # Tail the logfile in a thread
+        # Read the pipe in a thread
         stop_flag = {"stopped": False}
         # Track a short status snippet to show next to the timer
         phase = {"text": ""}
 
         def tailer():
             try:
-                with open(logfile, 'r', encoding='utf-8', errors='replace') as fh:
-                    fh.seek(0, os.SEEK_END)
+                with proc.stdout, log_fh:
                     self._init_stream_state(output)
                     # Lightweight progress parsing for eddblink progress lines
-                    import re
                     cur_file = None
                     line_buf = ''
 
@@ -1310,24 +1754,42 @@ class TdGuiApp(tk.Tk):
                                 set_phase(f"{cur_file} {fmt_bytes(cur)}/{fmt_bytes(tot)} {pct}%")
                             return
 
-                    while proc.poll() is None and not stop_flag["stopped"]:
-                        chunk = fh.read(1)
+                    # Blocks in the kernel until the child writes; b'' at EOF.
+                    # Stopping relies on the signal from _signal_proc: the read
+                    # returns once the process group exits and the pipe hits
+                    # EOF, or with the next chunk after stop_flag is set (a
+                    # grandchild that outlives the kill can still hold stdout)
+                    fd = proc.stdout.fileno()
+                    dec = _stream_decoder()
+                    last_flush = time.monotonic()
+                    while not stop_flag["stopped"]:
+                        data = os.read(fd, 65536)
+                        if not data:
+                            break
+                        try:
+                            log_fh.write(data)
+                            now = time.monotonic()
+                            if now - last_flush >= 1.0:
+                                log_fh.flush()
+                                last_flush = now
+                        except Exception:
+                            pass
+                        chunk = dec.decode(data)
                         if not chunk:
-                            time.sleep(0.25)
                             continue
                         try:
                             # Stream into log output (ANSI stripped, CR-aware)
                             self._feed_stream(output, chunk)
-                            # Build a line buffer for progress parsing
-                            ch = chunk
-                            if ch == '\r' or ch == '\n':
-                                parse_line(line_buf)
-                                line_buf = ''
-                            else:
-                                if ch != '\x1b':
-                                    line_buf += ch
+                            # Split complete lines out of the buffer for progress parsing
+                            parts = _LINE_SPLIT_RE.split(line_buf + chunk.replace('\x1b', ''))
+                            line_buf = parts.pop()
+                            for ln in parts:
+                                parse_line(ln)
                         except Exception:
                             pass
+                    chunk = dec.decode(b'', final=True)
+                    if chunk:
+                        self._feed_stream(output, chunk)
             except Exception:
                 pass
             # Process finished
@@ -1360,7 +1822,7 @@ class TdGuiApp(tk.Tk):
                 pass
             # Chain next task if requested and prior succeeded; else resume preempted sessions
             try:
-                rc = proc.poll()
+                rc = proc.wait()
             except Exception:
                 rc = None
             if chain and rc == 0 and not stop_flag.get("stopped"):
@@ -1375,7 +1837,8 @@ class TdGuiApp(tk.Tk):
                 if resume_after:
                     self.after(0, lambda lst=resume_after: self._resume_preempted_list(lst))
 
-        threading.Thread(target=tailer, daemon=True).start()
+        tail_thread = threading.Thread(target=tailer, daemon=True)
+        tail_thread.start()
 
         # Timer for this bg session
         timer = {"start": time.monotonic(), "job": None}
@@ -1398,30 +1861,9 @@ class TdGuiApp(tk.Tk):
 
         # Stop handler for this session
         def stop_bg():
-            try:
-                import signal
-                if sys.platform.startswith('win'):
-                    try:
-                        proc.send_signal(signal.CTRL_BREAK_EVENT)
-                    except Exception:
-                        proc.terminate()
-                else:
-                    try:
-                        os.killpg(os.getpgid(proc.pid), signal.SIGINT)
-                    except Exception:
-                        try:
-                            proc.send_signal(signal.SIGINT)
-                        except Exception:
-                            proc.terminate()
-            except Exception:
-                pass
-            # Ensure kill if needed after delay
+            self._signal_proc(proc)
+            # Mark stopped once the kill grace period is over
             def _ensure():
-                try:
-                    if proc.poll() is None:
-                        proc.kill()
-                except Exception:
-                    pass
                 stop_flag["stopped"] = True
                 try:
                     stop_btn.state(["disabled"])
@@ -1451,18 +1893,21 @@ class TdGuiApp(tk.Tk):
 
         # Register session and add tab before Help
         tab_id = str(tab)
-        self._bg_sessions[tab_id] = {
-            'proc': proc,
-            'output': output,
-            'status_var': status_var,
-            'stop_btn': stop_btn,
-            'start': timer["start"],
-            'logfile': logfile,
-            'title': title_hint,
-            'stop_flag': stop_flag,
-            'args': list(args),
-            'progress': bg_progress,
-        }
+        sess = BgSession(
+            proc=proc,
+            tab=tab,
+            output=output,
+            status_var=status_var,
+            stop_btn=stop_btn,
+            progress=bg_progress,
+            start=timer["start"],
+            logfile=logfile,
+            title=title_hint,
+            stop_flag=stop_flag,
+            args=list(args),
+            thread=tail_thread,
+        )
+        self._bg_sessions[tab_id] = sess
         # Insert this tab just before Help
         try:
             help_index = self.tabs.index(self.help_tab)
@@ -1478,28 +1923,7 @@ class TdGuiApp(tk.Tk):
     # ----- DB exclusive safeguard helpers -----
     def _requires_db_exclusive(self, full_args: List[str]) -> bool:
         try:
-            if len(full_args) < 3:
-                return False
-            sub = full_args[2]
-            if sub == 'buildcache':
-                return True
-            if sub != 'import':
-                return False
-            argv = full_args[3:]
-            plug = None
-            options_blob = " ".join(argv)
-            for i, a in enumerate(argv):
-                if a in ('-P', '--plug') and i + 1 < len(argv):
-                    plug = argv[i+1].lower()
-                    break
-            if plug == 'eddblink':
-                # Heaviest when doing clean/all (full schema/data rebuild)
-                if 'clean' in options_blob or 'all' in options_blob:
-                    return True
-            if plug == 'spansh':
-                # Large write import
-                return True
-            return False
+            return _requires_db_exclusive_argv(tuple(full_args))
         except Exception:
             return False
 
@@ -1509,9 +1933,9 @@ class TdGuiApp(tk.Tk):
         # Collect current sessions to resume
         for tab_id, sess in list(self._bg_sessions.items()):
             try:
-                proc = sess.get('proc')
-                args = sess.get('args')
-                title = sess.get('title')
+                proc = sess.proc
+                args = sess.args
+                title = sess.title
                 if proc and proc.poll() is None and args:
                     to_resume.append({'args': list(args), 'title': title})
                     # Close/stop the tab
@@ -1549,16 +1973,18 @@ class TdGuiApp(tk.Tk):
 
     def _restore_tab_title(self, tab_id: str):
         try:
-            if tab_id in self._bg_sessions:
-                title = self._bg_sessions[tab_id].get('title') or ''
+            sess = self._bg_sessions.get(tab_id)
+            if sess is not None:
+                title = sess.title or ''
                 self.tabs.tab(tab_id, text=title)
         except Exception:
             pass
 
     def _show_tab_close_glyph(self, tab_id: str):
         try:
-            if tab_id in self._bg_sessions:
-                base = self._bg_sessions[tab_id].get('title') or ''
+            sess = self._bg_sessions.get(tab_id)
+            if sess is not None:
+                base = sess.title or ''
                 # Append a small space and the multiplication sign
                 self.tabs.tab(tab_id, text=f"{base}  ×")
         except Exception:
@@ -1635,60 +2061,129 @@ class TdGuiApp(tk.Tk):
             return
         # Signal stop to running process if any
         try:
-            proc = sess.get('proc')
-            stop_flag = sess.get('stop_flag')
-            if isinstance(stop_flag, dict):
-                stop_flag['stopped'] = True
-            if proc and proc.poll() is None:
-                import signal
-                if sys.platform.startswith('win'):
-                    try:
-                        proc.send_signal(signal.CTRL_BREAK_EVENT)
-                    except Exception:
-                        try:
-                            proc.terminate()
-                        except Exception:
-                            pass
-                else:
-                    try:
-                        os.killpg(os.getpgid(proc.pid), signal.SIGINT)
-                    except Exception:
-                        try:
-                            proc.send_signal(signal.SIGINT)
-                        except Exception:
-                            try:
-                                proc.terminate()
-                            except Exception:
-                                pass
-                # Ensure kill after a grace period if still running
-                def _ensure_kill(p=proc):
-                    try:
-                        if p.poll() is None:
-                            p.kill()
-                    except Exception:
-                        pass
-                try:
-                    self.after(3000, _ensure_kill)
-                except Exception:
-                    pass
+            proc = sess.proc
+            sess.stop_flag['stopped'] = True
+            self._signal_proc(proc)
         except Exception:
             pass
-        # Remove tab from notebook
+        # Remove tab from notebook, unregister the session and destroy the tab
+        # (the reader thread exits at pipe EOF once the signal lands, or on
+        # its next read now that the stop flag is set)
         try:
             self.tabs.forget(tab_id)
         except Exception:
             pass
-        # Drop session entry
+        self._bg_sessions.pop(tab_id, None)
         try:
-            self._bg_sessions.pop(tab_id, None)
+            getattr(self, '_stream_state', {}).pop(sess.output, None)
+            self._out_queues.pop(sess.output, None)
+        except Exception:
+            pass
+        try:
+            sess.tab.destroy()
         except Exception:
             pass
 
     def _append_output(self, text: str):
-        def _append():
-            self.output.insert(tk.END, text)
-            self.output.see(tk.END)
-        self.after(0, _append)
+        # Any thread; the raw copy is kept by _flush_output on the Tk thread
+        self._queue_output(self.output, text, raw=True)
+
+    def _keep_raw_output(self, text: str):
+        # Tk thread only: keep the raw text for route parsing (bounded by
+        # size, oldest out)
+        raw = self._raw_output
+        raw.append(text)
+        self._raw_len += len(text)
+        self._raw_gen += 1
+        while self._raw_len > _RAW_OUTPUT_MAX_CHARS and len(raw) > 1:
+            self._raw_len -= len(raw.popleft())
+
+    def _output_text(self) -> str:
+        # The widget keeps only the last _OUTPUT_MAX_LINES lines; prefer the
+        # (much larger) raw buffer so long runs export and save whole. Runs
+        # streamed in progress mode aren't kept raw: read the widget then.
+        self._flush_output(self.output)
+        if self._raw_output:
+            return "".join(self._raw_output)
+        return self.output.get("1.0", tk.END)
+
+    def _reset_raw_output(self, text: str = ""):
+        # Called (Tk thread) whenever the Output tab is cleared or replaced
+        self._output_dirty = True
+        self._raw_gen += 1
+        self._raw_output.clear()
+        self._raw_len = 0
+        if text:
+            self._raw_output.append(text)
+            self._raw_len = len(text)
+
+    # ----- Batched output writes -----
+    def _queue_output(self, widget, text: str, replace: bool = False, raw: bool = False):
+        """Queue text for widget from any thread. Queued writes are applied in
+        order by one _flush_output call every _OUTPUT_FLUSH_MS, so a fast stream
+        costs one Tk insert per batch instead of one per line. Code that reads
+        the widget text calls _flush_output first. raw text is also kept for
+        route parsing when it is flushed (see _keep_raw_output)."""
+        q = self._out_queues.get(widget)
+        if q is None:
+            q = self._out_queues.setdefault(widget, deque())
+        q.append((replace, text, raw))
+        if widget not in self._out_flush_pending:
+            self._out_flush_pending.add(widget)
+            try:
+                self.after(_OUTPUT_FLUSH_MS, lambda w=widget: self._flush_output(w))
+            except Exception:
+                self._out_flush_pending.discard(widget)
+
+    def _flush_output(self, widget):
+        self._out_flush_pending.discard(widget)
+        q = self._out_queues.get(widget)
+        if not q:
+            return
+        if widget is getattr(self, 'output', None):
+            self._output_dirty = True
+        readonly = False
+        try:
+            # Follow the tail only if the view was already at the bottom, so a
+            # user scrolled up to read isn't yanked back on every batch
+            at_bottom = widget.yview()[1] >= 0.999
+            # A read-only widget is opened once for the whole batch
+            readonly = str(widget.cget('state')) == tk.DISABLED
+            if readonly:
+                widget.configure(state=tk.NORMAL)
+            pending: List[str] = []
+            while q:
+                replace, text, raw = q.popleft()
+                if raw:
+                    self._keep_raw_output(text)
+                if replace:
+                    # Replace current line (from line start to end-1c)
+                    if pending:
+                        widget.insert(tk.END, "".join(pending))
+                        pending = []
+                    widget.delete('end-1c linestart', 'end-1c')
+                    widget.insert(tk.END, text)
+                else:
+                    pending.append(text)
+            if pending:
+                widget.insert(tk.END, "".join(pending))
+            # Keep only the newest lines so long streams don't grow without bound
+            lines = int(widget.index('end-1c').split('.')[0])
+            if lines > _OUTPUT_MAX_LINES:
+                widget.delete('1.0', f"{lines - _OUTPUT_MAX_LINES + 1}.0")
+            if at_bottom:
+                widget.see(tk.END)
+            self._note_overflow(widget)
+        except Exception:
+            # Widget gone (e.g. closed background tab): drop what's queued
+            q.clear()
+            self._out_queues.pop(widget, None)
+        finally:
+            if readonly:
+                try:
+                    widget.configure(state=tk.DISABLED)
+                except Exception:
+                    pass
 
     # ----- Streaming helpers (handle carriage returns) -----
     def _init_stream_state(self, widget):
@@ -1731,102 +2226,84 @@ class TdGuiApp(tk.Tk):
         st['buf'] = ''
         if not text and not newline:
             return
-        def _do():
-            try:
-                if replace:
-                    # Replace current line (from line start to end-1c)
-                    widget.delete('end-1c linestart', 'end-1c')
-                    widget.insert(tk.END, text)
-                else:
-                    if text:
-                        widget.insert(tk.END, text)
-                    if newline:
-                        widget.insert(tk.END, '\n')
-                widget.see(tk.END)
-            except Exception:
-                pass
-        try:
-            self.after(0, _do)
-        except Exception:
-            pass
+        if replace:
+            self._queue_output(widget, text, replace=True)
+        else:
+            self._queue_output(widget, text + '\n' if newline else text)
 
     def _clear_output(self):
         self.output.delete("1.0", tk.END)
+        self._reset_raw_output()
     
     # ----- Routes parsing and UI -----
     def _clear_routes(self):
-        for child in list(self.routes_frame.winfo_children()):
+        # Hide pooled cards rather than destroying them
+        for rc in getattr(self, '_route_card_pool', ()):
             try:
-                child.destroy()
+                rc["frame"].grid_remove()
             except Exception:
                 pass
         self._route_cards = []
     
     def _strip_ansi(self, s: str) -> str:
-        import re
-        return re.sub(r"\x1b\[[0-9;]*m", "", s)
+        # Most output has no escapes at all; skip the scan and the copy
+        if '\x1b' not in s:
+            return s
+        return _ANSI_RE.sub("", s)
     
-    def _parse_routes(self, text: str) -> List[Dict[str, str]]:
-        import re
+    def _parse_routes(self, text: str) -> ParsedRoutes:
+        # The same output is re-parsed on every save/tab switch; reuse the
+        # last result while the text is unchanged
+        cache = getattr(self, '_routes_cache', None)
+        if cache is not None and cache[0] == text:
+            return cache[1]
+        raw = text
         # Normalize text
         text = self._strip_ansi(text)
-        lines = text.splitlines()
-        routes: List[Dict[str, str]] = []
-        current: List[str] = []
-        in_block = False
-        # Treat only top-level "Origin -> Destination" lines as route headers.
-        # Exclude lines that are jump/cruise descriptions which can also contain "->".
-        start_pat = re.compile(r"^(?!\s*(?:Jump|Direct|Supercruise)\b)\s*(.+?)\s*->\s*(.+?)(?:\s*\(score:.*)?\s*$")
-
-        def norm(s: str) -> str:
-            return re.sub(r"\s+", " ", (s or '').strip()).upper()
-
-        def flush():
-            nonlocal current, in_block
-            if not in_block or not current:
-                current = []
-                in_block = False
-                return
-            block = "\n".join(current).strip()
+        blocks: List[str] = []
+        origs: List[str] = []
+        dests: List[str] = []
+        keys: List[Tuple[str, str]] = []
+        titles: List[str] = []
+        norm = _norm_route_endpoint
+        # One pass over the whole text: each header starts a block that runs
+        # up to the next header (or the end of the output)
+        heads = list(_ROUTE_START_RE.finditer(text))
+        ends = [m.start() for m in heads[1:]] + [len(text)]
+        for m, end in zip(heads, ends):
+            block = text[m.start():end].strip()
             if block:
-                m = start_pat.match(current[0])
-                if m:
-                    dest_line = m.group(2).strip()
-                    orig_line = m.group(1).strip()
-                    routes.append({
-                        "block": block,
-                        "dest": dest_line,
-                        "orig": orig_line,
-                        "key": (norm(orig_line), norm(dest_line)),
-                    })
-            current = []
-            in_block = False
-
-        for ln in lines:
-            if start_pat.match(ln):
-                # Start a new route block
-                flush()
-                in_block = True
-                current.append(ln)
-                continue
-            if in_block:
-                # Only accumulate lines that belong to a detected route block
-                if ln.strip() == "" and not current:
-                    # skip leading empties (shouldn't occur when in_block)
-                    continue
-                current.append(ln)
-        # Finalize last block
-        flush()
+                dest_line = m.group(2).strip()
+                orig_line = m.group(1).strip()
+                blocks.append(block)
+                origs.append(orig_line)
+                dests.append(dest_line)
+                keys.append((norm(orig_line), norm(dest_line)))
+                titles.append(block.split("\n", 1)[0].strip())
+        routes = ParsedRoutes(tuple(blocks), tuple(origs), tuple(dests), tuple(keys), tuple(titles))
+        self._routes_cache = (raw, routes)
         return routes
     
+    def _get_parsed_routes(self) -> ParsedRoutes:
+        # Routes in the raw foreground output, parsed once per output change
+        # and shared by the route cards and the CSV/flat exports
+        # Take in raw output still queued for the widget
+        self._flush_output(self.output)
+        cache = self._parsed_routes_cache
+        if cache is not None and cache[0] == self._raw_gen:
+            return cache[1]
+        gen = self._raw_gen
+        routes = self._parse_routes("".join(self._raw_output))
+        self._parsed_routes_cache = (gen, routes)
+        return routes
+
     def _process_routes_from_output(self):
         try:
             if not self.current_meta or self.current_meta.name != 'run':
                 self._clear_routes()
                 return
-            text = self.output.get("1.0", tk.END)
-            routes = self._parse_routes(text)
-            if not routes:
+            routes = self._get_parsed_routes()
+            if not routes.blocks:
                 self._clear_routes()
                 return
             self._build_route_cards(routes)
@@ -1837,17 +2314,9 @@ class TdGuiApp(tk.Tk):
             self._clear_routes()
             return
     
-    def _build_route_cards(self, routes: List[Dict[str, str]]):
+    def _build_route_cards(self, routes: ParsedRoutes):
         self._clear_routes()
-        # Style for route cards
-        try:
-            style = ttk.Style(self)
-            style.configure("RouteCard.TFrame", background=self.colors["panel"], bordercolor=self.colors["line"], relief="groove")
-            style.configure("RouteCardSelected.TFrame", background=self.colors["surface"], bordercolor=self.colors["primary"], relief="solid")
-            style.configure("RouteTitle.TLabel", background=self.colors["panel"], foreground=self.colors["fg"])
-            style.configure("RouteBody.TLabel", background=self.colors["panel"], foreground=self.colors["muted"], wraplength=900, justify="left")
-        except Exception:
-            pass
+        # Route card styles are configured once in _apply_theme
         # Build cards
         # Enforce a maximum card count based on --routes (default 1)
         limit = self._max_route_cards() if self.current_meta and self.current_meta.name == 'run' else None
@@ -1856,56 +2325,75 @@ class TdGuiApp(tk.Tk):
 
         seen_keys = set()
         idx = 0
-        for rt in routes:
-            card = ttk.Frame(self.routes_frame, style="RouteCard.TFrame")
+        for block, dest, key, title in zip(routes.blocks, routes.dests, routes.keys, routes.titles):
             # Dedup identical routes by normalized (origin,destination)
-            title = rt["block"].splitlines()[0].strip()
-            key = rt.get("key") or (title.strip().upper(), rt.get("dest"," ").strip().upper())
             if key in seen_keys:
                 continue
             seen_keys.add(key)
             # Respect --routes limit
             if idx >= int(limit):
                 break
-            card.grid(row=idx, column=0, sticky="ew", padx=2, pady=2)
-            card.columnconfigure(0, weight=1)
-            # Title (first line)
-            lbl_title = ttk.Label(card, text=title, style="RouteTitle.TLabel")
-            lbl_title.grid(row=0, column=0, sticky="w", padx=8, pady=(6,2))
+            rc = self._route_card(idx)
+            rc["dest"] = dest
+            rc["title"] = title
+            rc["lbl_title"].configure(text=title)
             # Body (optional: show a short preview of next lines)
-            body_lines = rt["block"].splitlines()[1:6]
+            # Split off just the lines shown rather than the whole block
+            body_lines = block.split("\n", 6)[1:6]
             if body_lines:
-                lbl_body = ttk.Label(card, text="\n".join(body_lines), style="RouteBody.TLabel")
-                lbl_body.grid(row=1, column=0, sticky="ew", padx=8)
-            # Actions row
-            btn_row = ttk.Frame(card, style="RouteCard.TFrame")
-            btn_row.grid(row=2, column=0, sticky="ew", padx=8, pady=(4,8))
-            btn_row.columnconfigure(0, weight=1)
-            btn_row.columnconfigure(1, weight=0)
-            btn_row.columnconfigure(2, weight=0)
-            dest = rt.get("dest", "").strip()
-            btn_copy = ttk.Button(btn_row, text="Copy Dest", command=lambda d=dest: self._copy_text(d), style="Secondary.TButton")
-            btn_copy.grid(row=0, column=1, sticky="e", padx=(6,0))
-            btn_swap = ttk.Button(btn_row, text="Swap to From", command=lambda d=dest: self._swap_from_to_dest(d))
-            btn_swap.grid(row=0, column=2, sticky="e", padx=(6,0))
-            # Click to select highlight
-            def on_select(event=None, i=idx):
-                self._select_route_card(i)
-            for w in (card, lbl_title, btn_row):
-                try:
-                    w.bind("<Button-1>", on_select)
-                except Exception:
-                    pass
-            self._route_cards.append({"frame": card, "dest": dest, "title": title})
+                rc["lbl_body"].configure(text="\n".join(body_lines))
+                rc["lbl_body"].grid()
+            else:
+                rc["lbl_body"].grid_remove()
+            rc["frame"].configure(style=self._ensure_style("RouteCard.TFrame"))
+            rc["frame"].grid()
+            self._route_cards.append(rc)
             idx += 1
 
+    def _route_card(self, idx: int) -> Dict[str, Any]:
+        """Return pooled card #idx, creating its widgets on first use."""
+        pool = self._route_card_pool
+        if idx < len(pool):
+            return pool[idx]
+        rc: Dict[str, Any] = {"dest": "", "title": ""}
+        card = ttk.Frame(self.routes_frame, style=self._ensure_style("RouteCard.TFrame"))
+        card.grid(row=idx, column=0, sticky="ew", padx=2, pady=2)
+        card.columnconfigure(0, weight=1)
+        # Title (first line)
+        lbl_title = ttk.Label(card, style=self._ensure_style("RouteTitle.TLabel"))
+        lbl_title.grid(row=0, column=0, sticky="w", padx=8, pady=(6,2))
+        lbl_body = ttk.Label(card, style=self._ensure_style("RouteBody.TLabel"))
+        lbl_body.grid(row=1, column=0, sticky="ew", padx=8)
+        # Actions row
+        btn_row = ttk.Frame(card, style=self._ensure_style("RouteCard.TFrame"))
+        btn_row.grid(row=2, column=0, sticky="ew", padx=8, pady=(4,8))
+        btn_row.columnconfigure(0, weight=1)
+        btn_row.columnconfigure(1, weight=0)
+        btn_row.columnconfigure(2, weight=0)
+        # Buttons read the card's current dest, so re-use needs no rebinding
+        btn_copy = ttk.Button(btn_row, text="Copy Dest", command=lambda: self._copy_text(rc["dest"]), style=self._ensure_style("Secondary.TButton"))
+        btn_copy.grid(row=0, column=1, sticky="e", padx=(6,0))
+        btn_swap = ttk.Button(btn_row, text="Swap to From", command=lambda: self._swap_from_to_dest(rc["dest"]))
+        btn_swap.grid(row=0, column=2, sticky="e", padx=(6,0))
+        # Click to select highlight
+        def on_select(event=None, i=idx):
+            self._select_route_card(i)
+        for w in (card, lbl_title, btn_row):
+            try:
+                w.bind("<Button-1>", on_select)
+            except Exception:
+                pass
+        rc.update(frame=card, lbl_title=lbl_title, lbl_body=lbl_body)
+        pool.append(rc)
+        return rc
+
     def _max_route_cards(self) -> int:
         try:
             # Find '--routes' value from selected options; default is 1
-            for spec, wd in (self._selected or {}).items():
+            for spec, rs in (self._selected or {}).items():
                 try:
-                    if getattr(spec, 'dest', None) == 'routes' or spec.long_flag == '--routes':
-                        val = wd.get('value').get().strip() if wd.get('value') else ''
+                    if spec.dest == 'routes' or spec.long_flag == '--routes':
+                        val = rs.value.get().strip() if rs.value is not None else ''
                         n = int(val) if val else 1
                         return max(1, n)
                 except Exception:
@@ -1920,17 +2408,15 @@ class TdGuiApp(tk.Tk):
     def _select_route_card(self, index: int):
         for i, rc in enumerate(self._route_cards):
             try:
-                rc["frame"].configure(style="RouteCardSelected.TFrame" if i == index else "RouteCard.TFrame")
+                rc["frame"].configure(style=self._ensure_style("RouteCardSelected.TFrame" if i == index else "RouteCard.TFrame"))
             except Exception:
                 pass
         self._selected_route_index = index
         # Persist route selection
         try:
             label = self.cmd_var.get()
-            data = dict(getattr(self, '_prefs', {}) or {})
-            cmd_state = data.setdefault('commands', {}).setdefault(label, {})
+            cmd_state = self._touch_cmd_state(self._prefs_data(), label)
             cmd_state.setdefault('route', {})['selected_index'] = int(index)
-            self._prefs = data
         except Exception:
             pass
         self._schedule_save()
@@ -1952,33 +2438,34 @@ class TdGuiApp(tk.Tk):
             else:
                 return
         # Find the '--from' spec (dest 'starting')
-        spec = None
-        for s in self.current_meta.arguments + self.current_meta.switches:
-            if (s.dest == 'starting') or (s.long_flag.startswith('--from')):
-                spec = s
-                break
+        form = self._form or {}
+        spec = (form.get('by_dest') or {}).get('starting')
+        if spec is None:
+            spec = next((s for lf, s in (form.get('by_long') or {}).items() if lf.startswith('--from')), None)
         if not spec:
             return
         # Ensure selected and set value
-        sel_var = self.widget_vars.get(spec, {}).get('selected')
-        if sel_var is not None and not sel_var.get():
-            sel_var.set(True)
+        rs = self._rows.get(spec)
+        if rs is not None and not rs.selected.get():
+            rs.selected.set(True)
             self._ensure_selected_row(spec)
         row = self._selected.get(spec)
-        if row and row.get('value') is not None:
+        if row is not None and row.value is not None:
             try:
-                row['value'].set(dest)
+                row.value.set(dest)
             except Exception:
                 pass
         self._update_preview()
-        self._save_prefs()
+        self._schedule_save()
 
     # ----- Export helpers -----
     def _default_export_filename(self) -> str:
         return time.strftime("TD_%Y%m%d_%H%M%S")
 
     def _export_output(self):
-        text = self.output.get("1.0", tk.END)
+        # Read the output once (after applying queued writes); every format
+        # below works from this one string
+        text = self._output_text()
         if not text.strip():
             messagebox.showinfo("Export", "There is no output to export yet.")
             return
@@ -1999,29 +2486,49 @@ class TdGuiApp(tk.Tk):
         )
         if not path:
             return
+        # Everything that touches Tk (the command preview, the parsed routes)
+        # is gathered here; the file is rendered and written off the UI thread
         try:
+            command = self.preview_var.get()
             lower = path.lower()
             if lower.endswith(".pdf"):
-                self._export_pdf(self._strip_ansi(text), path)
+                work = functools.partial(self._export_pdf, self._strip_ansi(text), path, command)
             elif lower.endswith(".csv"):
-                routes = self._parse_routes(text)
-                self._export_csv(routes, path)
+                work = functools.partial(self._export_csv, self._export_routes(text), path)
             elif lower.endswith(".flat") or lower.endswith(".flat.txt"):
-                routes = self._parse_routes(text)
-                self._export_flat(routes, path)
+                work = functools.partial(self._export_flat, self._export_routes(text), path, command)
             elif lower.endswith(".raw") or lower.endswith(".raw.txt"):
-                self._export_txt(text, path, pretty=False)
+                work = functools.partial(self._export_txt, text, path, command, pretty=False)
             else:
                 # default to pretty text
-                self._export_txt(self._strip_ansi(text), path, pretty=True)
+                work = functools.partial(self._export_txt, self._strip_ansi(text), path, command, pretty=True)
+        except Exception as e:
+            messagebox.showerror("Export Failed", str(e))
+            return
+
+        def done(err: Optional[Exception]):
+            if err is not None:
+                messagebox.showerror("Export Failed", str(err))
+                return
             messagebox.showinfo("Export", f"Exported to:\n{path}")
             # Reveal the file in the platform file manager for convenience
             try:
                 self._reveal_in_file_manager(path)
             except Exception:
                 pass
-        except Exception as e:
-            messagebox.showerror("Export Failed", str(e))
+
+        def run_export():
+            err = None
+            try:
+                work()
+            except Exception as e:
+                err = e
+            try:
+                self.after(0, lambda: done(err))
+            except Exception:
+                pass
+
+        threading.Thread(target=run_export, daemon=True).start()
 
     # ----- Export/Import settings -----
     def _globals_snapshot(self) -> Dict[str, Any]:
@@ -2043,7 +2550,6 @@ class TdGuiApp(tk.Tk):
         reconstruct the exact state.
         """
         try:
-            import json
             label = self.cmd_var.get()
             if not label or not self.current_meta:
                 messagebox.showinfo("Export Settings", "No command selected to export.")
@@ -2069,8 +2575,8 @@ class TdGuiApp(tk.Tk):
             )
             if not path:
                 return
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, indent=2)
+            with open(path, 'wb') as f:
+                f.write(_json_dumps(payload))
             # Remember chosen folder for future imports/auto-backups
             try:
                 self._set_settings_dir(os.path.dirname(path))
@@ -2087,7 +2593,6 @@ class TdGuiApp(tk.Tk):
     def _import_settings(self):
         """Import settings JSON and restore UI: command, options, and globals."""
         try:
-            import json
             path = filedialog.askopenfilename(
                 title="Import Settings",
                 initialdir=self._settings_dir(),
@@ -2098,8 +2603,8 @@ class TdGuiApp(tk.Tk):
             )
             if not path:
                 return
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(path, 'rb') as f:
+                data = _json_loads(f.read())
             # Remember folder for auto-backup
             try:
                 self._set_settings_dir(os.path.dirname(path))
@@ -2159,12 +2664,14 @@ class TdGuiApp(tk.Tk):
                 return
 
             # Merge imported snapshot into in-memory prefs and switch UI to it
-            pref_data = dict(getattr(self, '_prefs', {}) or {})
+            pref_data = self._prefs_data()
+            self._ensure_cmd_state(label)
             cmds = pref_data.setdefault('commands', {})
             # Keep any pre-existing keys for that command but override with imported
             base = dict(cmds.get(label, {}) or {})
             base.update(snap)
             cmds[label] = base
+            self._dirty_labels.add(label)
             pref_data['selected_command'] = label
 
             # Temporarily suspend auto-saves to avoid overwriting the just-imported
@@ -2173,7 +2680,8 @@ class TdGuiApp(tk.Tk):
             old_susp = getattr(self, '_suspend_save', False)
             try:
                 self._suspend_save = True
-                self._prefs = pref_data
+                # Drop any cached form so the imported options are applied
+                self._discard_command_forms(label)
                 # Switch command; _on_command_change will apply saved state
                 self.cmd_var.set(label)
                 self._on_command_change()
@@ -2185,44 +2693,57 @@ class TdGuiApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("Import Settings Failed", str(e))
 
-    def _export_txt(self, text: str, path: str, pretty: bool = True):
+    def _export_txt(self, text: str, path: str, command: str, pretty: bool = True):
         header = []
         if pretty:
             header.append("Trade Dangerous GUI Export")
             header.append(f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            header.append(f"Command: {self.preview_var.get()}")
+            header.append(f"Command: {command}")
             header.append("-" * 80)
         with open(path, "w", encoding="utf-8") as f:
             if header:
                 f.write("\n".join(header) + "\n\n")
             f.write(text.rstrip() + "\n")
 
-    def _export_flat(self, routes: List[Dict[str, str]], path: str):
-        lines: List[str] = []
-        lines.append(f"Trade Dangerous GUI Flat Export ({time.strftime('%Y-%m-%d %H:%M:%S')})")
-        lines.append(f"Command: {self.preview_var.get()}")
-        lines.append("-" * 80)
-        for i, r in enumerate(routes, 1):
-            title = self._strip_ansi(r.get("block", "").splitlines()[0])
-            lines.append(f"{i:02d}. {title}")
+    def _export_routes(self, text: str) -> ParsedRoutes:
+        # Reuse the routes already parsed for the cards; fall back to the
+        # widget text when no raw output is held (e.g. progress-mode runs)
+        self._flush_output(self.output)
+        if self._raw_output:
+            return self._get_parsed_routes()
+        return self._parse_routes(text)
+
+    def _export_flat(self, routes: ParsedRoutes, path: str, command: str):
+        header = [
+            f"Trade Dangerous GUI Flat Export ({time.strftime('%Y-%m-%d %H:%M:%S')})",
+            f"Command: {command}",
+            "-" * 80,
+        ]
+        # Blocks come from ANSI-stripped text; titles are precomputed
+        body = [f"{i:02d}. {title}" for i, title in enumerate(routes.titles, 1)]
         with open(path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines) + "\n")
+            f.write("\n".join(header + body) + "\n")
 
-    def _export_csv(self, routes: List[Dict[str, str]], path: str):
+    def _export_csv(self, routes: ParsedRoutes, path: str):
         import csv
-        with open(path, "w", encoding="utf-8", newline="") as f:
-            w = csv.writer(f)
-            w.writerow(["index", "origin", "destination", "route_title", "detail_preview"]) 
-            for i, r in enumerate(routes, 1):
-                title = self._strip_ansi(r.get("block", "").splitlines()[0])
+
+        def rows():
+            # Blocks come from ANSI-stripped text; titles are precomputed
+            cols = zip(routes.blocks, routes.dests, routes.titles)
+            for i, (block, rdest, title) in enumerate(cols, 1):
                 parts = [p.strip() for p in title.split("->", 1)]
                 origin = parts[0] if parts else ""
-                dest = parts[1] if len(parts) > 1 else r.get("dest", "")
-                body_lines = r.get("block", "").splitlines()[1:6]
-                preview = " | ".join(self._strip_ansi(bl).strip() for bl in body_lines)
-                w.writerow([i, origin, dest, title, preview])
+                dest = parts[1] if len(parts) > 1 else rdest
+                preview = " | ".join(bl.strip() for bl in block.split("\n", 6)[1:6])
+                yield (i, origin, dest, title, preview)
+
+        # Large buffer: the whole export typically goes out in a few writes
+        with open(path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+            w = csv.writer(f)
+            w.writerow(["index", "origin", "destination", "route_title", "detail_preview"])
+            w.writerows(rows())
 
-    def _export_pdf(self, text: str, path: str):
+    def _export_pdf(self, text: str, path: str, command: str):
         try:
             from reportlab.lib.pagesizes import letter
             from reportlab.pdfgen import canvas
@@ -2231,58 +2752,99 @@ class TdGuiApp(tk.Tk):
         except Exception:
             raise RuntimeError("PDF export requires 'reportlab'. Install with: pip install reportlab")
         page_size = letter
-        c = canvas.Canvas(path, pagesize=page_size)
-        width, height = page_size
-        left = 0.75 * inch
-        right = width - 0.75 * inch
-        top = height - 0.75 * inch
-        y = top
-        font_name = "Courier"
-        font_size = 10
-        line_h = 12
-        c.setFont(font_name, font_size)
-        # Header
-        header = [
-            "Trade Dangerous GUI Export",
-            f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}",
-            f"Command: {self.preview_var.get()}",
-            "-" * 80,
-        ]
-        lines = header + text.splitlines()
-        def wrap_line(s: str) -> List[str]:
-            s = s.replace('\t', '    ')
+        # reportlab emits many small writes; give it a large file buffer
+        fp = open(path, 'wb', buffering=1 << 20)
+        try:
+            c = canvas.Canvas(fp, pagesize=page_size)
+            width, height = page_size
+            left = 0.75 * inch
+            right = width - 0.75 * inch
+            top = height - 0.75 * inch
+            y = top
+            font_name = "Courier"
+            font_size = 10
+            line_h = 12
+            c.setFont(font_name, font_size)
+            # Header
+            header = [
+                "Trade Dangerous GUI Export",
+                f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+                f"Command: {command}",
+                "-" * 80,
+            ]
+            lines = header + text.splitlines()
             maxw = right - left
-            if stringWidth(s, font_name, font_size) <= maxw:
-                return [s]
-            # word wrap
-            out: List[str] = []
-            cur = ""
-            for word in s.split(" "):
-                trial = (cur + (" " if cur else "") + word)
-                if stringWidth(trial, font_name, font_size) <= maxw:
-                    cur = trial
-                else:
-                    if cur:
-                        out.append(cur)
-                    cur = word
-            if cur:
-                out.append(cur)
-            return out
-        for raw in lines:
-            for ln in wrap_line(raw):
-                if y - line_h < 0.75 * inch:
-                    c.showPage()
-                    c.setFont(font_name, font_size)
-                    y = top
-                c.drawString(left, y, ln)
-                y -= line_h
-        c.save()
+            # Courier is monospaced: wrap by character count instead of measuring
+            # every candidate line
+            monospace = font_name.startswith("Courier")
+            max_chars = max(1, int(maxw / stringWidth("M", font_name, font_size)))
+            def wrap_line(s: str) -> List[str]:
+                s = s.replace('\t', '    ')
+                if monospace:
+                    if len(s) <= max_chars:
+                        return [s]
+                    return textwrap.wrap(s, width=max_chars, break_long_words=False, break_on_hyphens=False) or [s]
+                if stringWidth(s, font_name, font_size) <= maxw:
+                    return [s]
+                # word wrap
+                out: List[str] = []
+                cur = ""
+                for word in s.split(" "):
+                    trial = (cur + (" " if cur else "") + word)
+                    if stringWidth(trial, font_name, font_size) <= maxw:
+                        cur = trial
+                    else:
+                        if cur:
+                            out.append(cur)
+                        cur = word
+                if cur:
+                    out.append(cur)
+                return out
+            def new_page_text():
+                # One text object (a single BT/ET block) per page
+                tobj = c.beginText(left, top)
+                tobj.setFont(font_name, font_size)
+                tobj.setLeading(line_h)
+                return tobj
+            tobj = new_page_text()
+            for raw in lines:
+                for ln in wrap_line(raw):
+                    if y - line_h < 0.75 * inch:
+                        c.drawText(tobj)
+                        c.showPage()
+                        tobj = new_page_text()
+                        y = top
+                    tobj.textLine(ln)
+                    y -= line_h
+            c.drawText(tobj)
+            c.save()
+        finally:
+            fp.close()
 
     def _show_help(self):
         # Show CLI help for the selected command into the Help tab
         if not self.current_meta:
             return
-        args = [sys.executable, self.trade_py, self.current_meta.name, "-h"]
+        name = self.current_meta.name
+
+        def write(out: str):
+            # Drop results for a command that is no longer shown
+            if not self.current_meta or self.current_meta.name != name:
+                return
+            self.help_text.delete("1.0", tk.END)
+            self.help_text.insert(tk.END, out)
+            self._note_overflow(self.help_text)
+            self.tabs.select(1)
+
+        # `<cmd> -h` output doesn't change while the GUI runs: launch it once
+        # per command, and never twice concurrently
+        cached = self._help_cache.get(name)
+        if cached is not None:
+            write(cached)
+            return
+        if name in self._help_inflight:
+            return
+        args = [sys.executable, self.trade_py, name, "-h"]
 
         def run_help():
             try:
@@ -2291,17 +2853,26 @@ class TdGuiApp(tk.Tk):
                     cwd=self.repo_dir,
                     stderr=subprocess.STDOUT,
                     universal_newlines=True,
-                    env={**os.environ, "PYTHONIOENCODING": "UTF-8"},
+                    env=self._subprocess_env,
                 )
+                ok = True
             except subprocess.CalledProcessError as e:
-                out = e.output
-            def write():
-                self.help_text.delete("1.0", tk.END)
-                self.help_text.insert(tk.END, out)
-                self.tabs.select(1)
-            self.after(0, write)
+                # trade.py exits non-zero after printing help; still cacheable
+                out, ok = e.output, True
+            except Exception as e:
+                out, ok = str(e), False
+
+            def done():
+                self._help_inflight.discard(name)
+                if ok:
+                    self._help_cache[name] = out
+                write(out)
+            self.after(0, done)
 
-        threading.Thread(target=run_help, daemon=True).start()
+        if self._help_worker is None:
+            self._help_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="td-gui-help")
+        self._help_inflight.add(name)
+        self._help_worker.submit(run_help)
 
     def _on_tab_changed(self, event=None):
         # Load help when Help tab is selected
@@ -2316,10 +2887,8 @@ class TdGuiApp(tk.Tk):
         try:
             current = self.tabs.index(sel)
             label = self.cmd_var.get()
-            data = dict(getattr(self, '_prefs', {}) or {})
-            cmd_state = data.setdefault('commands', {}).setdefault(label, {})
+            cmd_state = self._touch_cmd_state(self._prefs_data(), label)
             cmd_state['tab_index'] = int(current)
-            self._prefs = data
         except Exception:
             pass
         self._schedule_save()
@@ -2410,7 +2979,7 @@ class TdGuiApp(tk.Tk):
     def _set_run_button_mode(self, mode: str = 'run'):
         # Always keep normal Run behavior; 'Add via Command' removed
         try:
-            self.run_btn.configure(text='Run', command=self._run, style='Accent.TButton')
+            self.run_btn.configure(text='Run', command=self._run, style=self._ensure_style('Accent.TButton'))
         except Exception:
             pass
 
@@ -2430,7 +2999,6 @@ class TdGuiApp(tk.Tk):
             pass
 
     def _validate_backup_name(self, name: str) -> bool:
-        import re
         if not name:
             return False
         # allow letters, numbers, dash, underscore, dot
@@ -2455,7 +3023,6 @@ class TdGuiApp(tk.Tk):
 
     def _export_settings_to_path(self, label: Optional[str], path: str):
         try:
-            import json
             if not label:
                 label = self.cmd_var.get()
             if not label or not self.current_meta:
@@ -2469,8 +3036,8 @@ class TdGuiApp(tk.Tk):
                 'commands': {label: snap},
             }
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, indent=2)
+            with open(path, 'wb') as f:
+                f.write(_json_dumps(payload))
         except Exception:
             pass
 
@@ -2519,7 +3086,7 @@ class TdGuiApp(tk.Tk):
     
     # ----- Preferences (persist CWD/DB) -----
     def _config_dir(self) -> str:
-        if sys.platform.startswith('win'):
+        if _IS_WIN:
             base = os.getenv('APPDATA') or os.path.expanduser('~')
             return os.path.join(base, 'TradeDangerous')
         elif sys.platform == 'darwin':
@@ -2544,15 +3111,21 @@ class TdGuiApp(tk.Tk):
         except Exception:
             return self._config_dir()
 
+    def _prefs_data(self) -> Dict[str, Any]:
+        # The live prefs dict; callers update it in place (a shallow copy
+        # would share the nested command states anyway)
+        data = getattr(self, '_prefs', None)
+        if not isinstance(data, dict):
+            data = self._prefs = {}
+        return data
+
     def _set_settings_dir(self, path: str):
         try:
             if not path:
                 return
-            data = dict(getattr(self, '_prefs', {}) or {})
-            data['settings_dir'] = path
-            self._prefs = data
+            self._prefs_data()['settings_dir'] = path
             # Save soon
-            self._schedule_save(500)
+            self._schedule_save()
         except Exception:
             pass
 
@@ -2560,11 +3133,17 @@ class TdGuiApp(tk.Tk):
         try:
             p = self._prefs_path()
             if os.path.isfile(p):
-                import json
-                with open(p, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(p, 'rb') as f:
+                    data = _json_loads(f.read())
                 # Keep raw prefs for later saves
                 self._prefs = data if isinstance(data, dict) else {}
+                cmds = self._prefs.get('commands')
+                if not isinstance(cmds, dict):
+                    cmds = self._prefs['commands'] = {}
+                # States still stored inline (older prefs) move to their own
+                # files on the next save. Per-command files are read the first
+                # time their command is shown (see _ensure_cmd_state)
+                self._dirty_labels.update(cmds)
                 cwd = self._prefs.get('cwd')
                 db = self._prefs.get('db')
                 linkly = self._prefs.get('linkly')
@@ -2615,20 +3194,127 @@ class TdGuiApp(tk.Tk):
             # Ignore preference loading errors silently
             self._prefs = {}
 
-    def _save_prefs(self):
+    def _cmd_state_path(self, label: str) -> str:
+        return os.path.join(self._config_dir(), _cmd_state_filename(label))
+
+    def _touch_cmd_state(self, data: Dict[str, Any], label: str) -> Dict[str, Any]:
+        """Return data's saved state for label (created if missing), marking
+        it dirty so the next prefs write includes that command's file."""
+        self._ensure_cmd_state(label)
+        self._dirty_labels.add(label)
+        return data.setdefault('commands', {}).setdefault(label, {})
+
+    def _write_prefs_file(self, data: Dict[str, Any]):
+        # Globals go to the main prefs file; per-command states to their own
+        # files, and only for commands marked dirty since the last write
+        self._drain_prefs_results()
+        main = {k: v for k, v in data.items() if k != 'commands'}
+        self._write_json_file(self._prefs_path(), main)
+        cmds = data.get('commands') or {}
+        dirty, self._dirty_labels = self._dirty_labels, set()
+        for label in dirty:
+            # An inline (older prefs) state never shown this session still
+            # defers to its file, as it would have at load time
+            self._ensure_cmd_state(label)
+            state = cmds.get(label)
+            if isinstance(state, dict):
+                self._write_json_file(self._cmd_state_path(label), {'label': label, 'state': state}, label)
+
+    def _write_json_file(self, path: str, obj: Any, label: Optional[str] = None):
+        # Skip the write entirely when the serialized bytes are identical to
+        # what was last written to this path
+        blob = _json_dumps(obj)
+        h = _prefs_fingerprint(blob)
+        pending = self._file_pending.get(path)
+        if h == (pending if pending is not None else self._file_hashes.get(path)):
+            return
+        self._file_pending[path] = h
+        writer = getattr(self, '_prefs_writer', None)
+        if writer is None:
+            self._prefs_blob_written(self._prefs_epoch, path, h, label,
+                                     self._write_prefs_blob(path, blob))
+        else:
+            writer.submit(self._write_prefs_job, self._prefs_epoch, path, blob, h, label)
+
+    def _write_prefs_job(self, epoch: int, path: str, blob: bytes, h: bytes, label: Optional[str]):
+        # Runs on the prefs writer thread. No Tk calls here: _on_close waits
+        # for this thread from the Tk thread
+        ok = self._write_prefs_blob(path, blob)
+        self._prefs_results.append((epoch, path, h, label, ok))
+
+    def _drain_prefs_results(self):
+        # Tk thread: record the writes the prefs writer has finished
+        results = self._prefs_results
+        while results:
+            self._prefs_blob_written(*results.popleft())
+
+    @staticmethod
+    def _write_prefs_blob(path: str, blob: bytes) -> bool:
+        # Write to a temp file and swap it in so an interrupted write never
+        # leaves a truncated prefs file behind
+        try:
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, path)
+            return True
+        except Exception:
+            return False
+
+    def _prefs_blob_written(self, epoch: int, path: str, h: bytes, label: Optional[str], ok: bool):
+        # Tk thread: the fingerprint is recorded only once the new file is in place
+        if epoch != self._prefs_epoch:
+            return
+        if ok:
+            self._file_hashes[path] = h
+        elif label is not None:
+            # Let the next save retry
+            self._dirty_labels.add(label)
+        if self._file_pending.get(path) == h:
+            self._file_pending.pop(path, None)
+
+    def _ensure_cmd_state(self, label: str):
+        """Read label's per-command prefs file into prefs the first time the
+        label is needed, so startup doesn't parse every command's file."""
+        if not label or label in self._loaded_labels:
+            return
+        self._loaded_labels.add(label)
+        path = self._cmd_state_path(label)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            return
+        try:
+            rec = _json_loads(blob)
+            state = rec.get('state')
+            if rec.get('label') == label and isinstance(state, dict):
+                self._prefs_data().setdefault('commands', {})[label] = state
+                self._file_hashes[path] = _prefs_fingerprint(blob)
+        except Exception:
+            pass
+
+    def _save_prefs(self, capture_output: bool = True):
         if getattr(self, '_suspend_save', False):
             return
+        # A direct save supersedes any pending debounced one
+        job = getattr(self, '_save_job', None)
+        if job:
+            self._save_job = None
+            try:
+                self.after_cancel(job)
+            except Exception:
+                pass
         try:
             d = self._config_dir()
             os.makedirs(d, exist_ok=True)
-            import json
-            # Start with previous prefs to preserve per-command states
-            data = dict(getattr(self, '_prefs', {}) or {})
+            # Update the previous prefs in place to preserve per-command states
+            data = self._prefs_data()
             # Capture current command snapshot (options/output/preview/tab/scroll/route)
             try:
                 current_label = self.cmd_var.get()
                 if current_label and self.current_meta:
-                    snap = self._capture_session(current_label)
+                    snap = self._capture_session(current_label, capture_output=capture_output)
                     data.setdefault('commands', {})[current_label] = {
                         **data.get('commands', {}).get(current_label, {}),
                         **snap,
@@ -2649,49 +3335,70 @@ class TdGuiApp(tk.Tk):
                 'settings_dir': data.get('settings_dir') or os.path.join(self._config_dir(), 'settings'),
             })
             # Legacy path handled by snapshot above; nothing further needed for current command
-            self._prefs = data
-            with open(self._prefs_path(), 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            self._write_prefs_file(data)
+            self._prefs_dirty = False
         except Exception:
             # Ignore preference saving errors silently
             pass
 
     def _on_close(self):
+        # Let queued writes land (they may be other commands' files), then
+        # write the final prefs synchronously
+        writer, self._prefs_writer = getattr(self, '_prefs_writer', None), None
+        if writer is not None:
+            try:
+                writer.shutdown(wait=True)
+            except Exception:
+                pass
+            self._drain_prefs_results()
+        try:
+            self._flush_scroll_prefs()
+        except Exception:
+            pass
         try:
             self._save_prefs()
         except Exception:
             pass
         self.destroy()
 
-    def _apply_saved_state_for_current(self):
-        """Apply saved selection and values for the current command, if available."""
+    def _apply_saved_state_for_current(self, include_options: bool = True):
+        """Apply saved selection and values for the current command, if available.
+        With include_options=False only the shared widgets (output, tab, preview,
+        scroll, route) are restored; the option forms are left as they are.
+        """
+        # Restoring must not write prefs back mid-way; one debounced save
+        # may follow once the state is fully applied
+        old_susp = getattr(self, '_suspend_save', False)
+        self._suspend_save = True
+        try:
+            self._apply_saved_state(include_options)
+        finally:
+            self._suspend_save = old_susp
+
+    def _apply_saved_state(self, include_options: bool):
         try:
             if not self.current_meta:
                 return
             data = getattr(self, '_prefs', {}) or {}
             cmds = data.get('commands', {})
             state = cmds.get(self.cmd_var.get(), {})
-            options = state.get('options', {})
+            options = state.get('options', {}) if include_options else {}
             # Update selection states and row values
             for group_name, specs in self._categorize_current():
                 for spec in specs:
                     # Be liberal in what we accept: try several possible keys
-                    opt = (
-                        options.get(spec.key)
-                        or (spec.dest and options.get(spec.dest))
-                        or options.get(spec.long_flag)
-                        or options.get(spec.long_flag.lstrip('-'))
-                        or (spec.args and options.get(spec.args[0]))
-                        or None
-                    )
+                    opt = next((o for o in map(options.get, spec.state_keys) if o), None)
                     if not opt:
                         continue
                     is_required = spec in self.current_meta.arguments
                     target_sel = True if is_required else bool(opt.get('selected', False))
-                    sel_var = self.widget_vars.get(spec, {}).get('selected')
-                    if sel_var is not None:
+                    # Only write vars whose value differs: every set() runs
+                    # the var's traces (preview/save scheduling, row widgets)
+                    rs = self._rows.get(spec)
+                    if rs is not None:
                         try:
-                            sel_var.set(target_sel)
+                            if bool(rs.selected.get()) != target_sel:
+                                rs.selected.set(target_sel)
                         except Exception:
                             pass
                     if target_sel:
@@ -2699,13 +3406,17 @@ class TdGuiApp(tk.Tk):
                         row = self._selected.get(spec)
                         if spec.is_flag:
                             try:
-                                row.get('flag').set(bool(opt.get('flag', True)))
+                                flag = bool(opt.get('flag', True))
+                                if bool(row.value.get()) != flag:
+                                    row.value.set(flag)
                             except Exception:
                                 pass
                         else:
-                            if 'value' in opt and row and row.get('value') is not None:
+                            if 'value' in opt and row is not None and row.value is not None:
                                 try:
-                                    row.get('value').set(str(opt.get('value') or ''))
+                                    sval = str(opt.get('value') or '')
+                                    if row.value.get() != sval:
+                                        row.value.set(sval)
                                 except Exception:
                                     pass
             # Restore saved terminal output for this command, if available
@@ -2717,6 +3428,7 @@ class TdGuiApp(tk.Tk):
                     self.output.see(tk.END)
                 except Exception:
                     pass
+                self._reset_raw_output(out)
                 # Rebuild route cards if this is 'run'
                 if self.current_meta.name == 'run':
                     try:
@@ -2734,22 +3446,12 @@ class TdGuiApp(tk.Tk):
             try:
                 pv = state.get('preview')
                 if isinstance(pv, str) and pv:
+                    self._cancel_preview()
                     self.preview_var.set(pv)
             except Exception:
                 pass
             # Restore scroll positions (defer to ensure widgets laid out)
-            try:
-                scr = state.get('scroll') or {}
-                oy = scr.get('output_yview')
-                sy = scr.get('selected_yview')
-                if isinstance(oy, (list, tuple)) and len(oy) >= 1:
-                    first = float(oy[0])
-                    self.after(0, lambda f=first: self._safe_yview_moveto(self.output, f))
-                if isinstance(sy, (list, tuple)) and len(sy) >= 1:
-                    first = float(sy[0])
-                    self.after(0, lambda f=first: self._safe_yview_moveto(self.sel_canvas, f))
-            except Exception:
-                pass
+            self._restore_scroll(state.get('scroll'))
             # Restore selected route index if any
             try:
                 rt = state.get('route') or {}
@@ -2773,55 +3475,57 @@ class TdGuiApp(tk.Tk):
         if not label or not self.current_meta:
             return
         try:
-            import json
             d = self._config_dir()
             os.makedirs(d, exist_ok=True)
-            # Start from existing prefs and capture snapshot
-            data = dict(getattr(self, '_prefs', {}) or {})
+            # Update the existing prefs in place with a fresh snapshot
+            data = self._prefs_data()
             snap = self._capture_session(label)
             data.setdefault('commands', {})[label] = {
                 **data.get('commands', {}).get(label, {}),
                 **snap,
             }
             # Keep globals and selected_command untouched here; _save_prefs will handle them
-            self._prefs = data
-            with open(self._prefs_path(), 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            self._write_prefs_file(data)
         except Exception:
             pass
 
     # ----- Session snapshot API -----
-    def _capture_session(self, label: str) -> Dict[str, Any]:
+    def _capture_session(self, label: str, capture_output: bool = True) -> Dict[str, Any]:
         """Capture current on-screen state for the given label into a snapshot dict
         and update in-memory prefs for that label. Returns the snapshot.
+        With capture_output=False the Output tab text is left out (and the
+        label's previously saved output kept).
         """
         snap: Dict[str, Any] = {}
         try:
             if not label or not self.current_meta:
                 return snap
-            data = dict(getattr(self, '_prefs', {}) or {})
-            cmd_state = data.setdefault('commands', {}).setdefault(label, {})
+            cmd_state = self._touch_cmd_state(self._prefs_data(), label)
             # Options (selection/value/flag)
             options = cmd_state.setdefault('options', {})
             for _grp, specs in self._categorize_current():
                 for spec in specs:
                     key = spec.key
-                    sel_var = self.widget_vars.get(spec, {}).get('selected')
-                    selected = bool(sel_var.get()) if sel_var is not None else False
+                    rs = self._rows.get(spec)
+                    selected = bool(rs.selected.get()) if rs is not None else False
                     rec = options.setdefault(key, {})
                     rec['selected'] = selected
+                    row = self._selected.get(spec)
                     if spec.is_flag:
-                        wd = self._selected.get(spec)
-                        rec['flag'] = bool(wd.get('flag').get()) if wd and wd.get('flag') else False
+                        rec['flag'] = bool(row.value.get()) if row is not None and row.value is not None else False
                     else:
-                        wd = self._selected.get(spec)
-                        rec['value'] = str(wd.get('value').get()) if wd and wd.get('value') else ''
+                        rec['value'] = str(row.value.get()) if row is not None and row.value is not None else ''
             snap['options'] = options
-            # Output text
-            try:
-                snap['output'] = self.output.get("1.0", tk.END)
-            except Exception:
-                pass
+            # Output text; unchanged output reuses the last captured copy
+            if capture_output:
+                try:
+                    self._flush_output(self.output)
+                    if self._output_dirty:
+                        self._output_snapshot = self._output_text()
+                        self._output_dirty = False
+                    snap['output'] = self._output_snapshot
+                except Exception:
+                    pass
             # Preview
             try:
                 snap['preview'] = self.preview_var.get()
@@ -2854,9 +3558,7 @@ class TdGuiApp(tk.Tk):
             except Exception:
                 pass
             # Update in-memory prefs
-            for k, v in snap.items():
-                cmd_state[k] = v
-            self._prefs = data
+            cmd_state.update(snap)
         except Exception:
             pass
         return snap
@@ -2872,6 +3574,7 @@ class TdGuiApp(tk.Tk):
             pv = snapshot.get('preview')
             if isinstance(pv, str) and pv:
                 try:
+                    self._cancel_preview()
                     self.preview_var.set(pv)
                 except Exception:
                     pass
@@ -2883,21 +3586,7 @@ class TdGuiApp(tk.Tk):
                 except Exception:
                     pass
             # Scrolls
-            scr = snapshot.get('scroll') or {}
-            oy = scr.get('output_yview')
-            sy = scr.get('selected_yview')
-            if isinstance(oy, (list, tuple)) and len(oy) >= 1:
-                try:
-                    first = float(oy[0])
-                    self.after(0, lambda f=first: self._safe_yview_moveto(self.output, f))
-                except Exception:
-                    pass
-            if isinstance(sy, (list, tuple)) and len(sy) >= 1:
-                try:
-                    first = float(sy[0])
-                    self.after(0, lambda f=first: self._safe_yview_moveto(self.sel_canvas, f))
-                except Exception:
-                    pass
+            self._restore_scroll(snapshot.get('scroll'))
             # Route selection
             rt = snapshot.get('route') or {}
             idx = rt.get('selected_index')
@@ -2915,11 +3604,19 @@ class TdGuiApp(tk.Tk):
         try:
             # Remove prefs on disk
             p = self._prefs_path()
-            if os.path.isfile(p):
-                try:
-                    os.remove(p)
-                except Exception:
-                    pass
+            paths = glob.glob(os.path.join(self._config_dir(), 'td_gui_cmd_*.json'))
+            for path in [p] + paths:
+                if os.path.isfile(path):
+                    try:
+                        os.remove(path)
+                    except Exception:
+                        pass
+            self._prefs_epoch += 1
+            self._file_hashes.clear()
+            self._file_pending.clear()
+            self._dirty_labels.clear()
+            # Nothing left on disk to read
+            self._loaded_labels = set(self.cmd_metas)
             self._prefs = {}
             self._restore_cmd = None
             # Reset globals
@@ -2929,6 +3626,9 @@ class TdGuiApp(tk.Tk):
             self.detail_var.set(0)
             self.quiet_var.set(0)
             self.debug_var.set(0)
+            # Rebuild every option form from defaults; nothing to carry over
+            self._discard_command_forms()
+            self._current_cmd_label = None
             # Reset to initial command ordering
             all_cmds = self._ordered_command_labels()
             if all_cmds:
@@ -2941,7 +3641,9 @@ class TdGuiApp(tk.Tk):
 
     # ----- Mouse wheel helpers -----
     def _install_global_mousewheel(self):
-        # Fallback: route wheel events to nearest scrollable ancestor anywhere in the app
+        # Fallback: route wheel events to nearest scrollable ancestor anywhere in the app.
+        # Kept app-wide because wheel events go to the child under the cursor
+        # (entries, labels inside a form), which the per-widget bindings can't see
         self.bind_all("<MouseWheel>", self._on_global_mousewheel, add=True)
         self.bind_all("<Button-4>", self._on_global_mousewheel, add=True)  # X11 up
         self.bind_all("<Button-5>", self._on_global_mousewheel, add=True)  # X11 down
@@ -2949,22 +3651,58 @@ class TdGuiApp(tk.Tk):
     def _bind_mousewheel_target(self, widget, target=None):
         # Bind wheel directly to a scrollable widget or route to a target (e.g., inner frame -> canvas)
         tgt = target or widget
+        # Lets the global fallback stop its ancestor walk here
+        try:
+            widget._wheel_target = tgt
+        except Exception:
+            pass
+
+        # _scroll_target(target, ev): Tk supplies the event as the last arg
+        handler = functools.partial(self._scroll_target, tgt)
+        widget.bind("<MouseWheel>", handler, add=True)
+        widget.bind("<Button-4>", handler, add=True)
+        widget.bind("<Button-5>", handler, add=True)
 
-        def _on_local_wheel(ev):
-            return self._scroll_target(tgt, ev)
+    def _note_overflow(self, widget, first=None, last=None):
+        # Content or view changed: record the fresh span if known, else drop it
+        try:
+            key = str(widget)
+            if first is None:
+                self._overflow_cache.pop(key, None)
+            else:
+                self._overflow_cache[key] = (float(last) - float(first)) < 0.999
+        except Exception:
+            pass
 
-        widget.bind("<MouseWheel>", _on_local_wheel, add=True)
-        widget.bind("<Button-4>", _on_local_wheel, add=True)
-        widget.bind("<Button-5>", _on_local_wheel, add=True)
+    def _forget_overflow(self, key: str):
+        self._overflow_cache.pop(key, None)
+        self._overflow_bound.discard(key)
 
     def _on_global_mousewheel(self, ev):
         # Try to find a scrollable ancestor under the cursor and scroll it
-        w = ev.widget
-        # Walk up to find a widget that supports yview_scroll (Canvas/Text/Listbox/Treeview)
+        src = ev.widget
+        # Resolved once per widget; False means "nothing scrollable above it"
+        tgt = getattr(src, '_wheel_target', None)
+        if tgt is None:
+            tgt = self._resolve_wheel_target(src)
+            try:
+                src._wheel_target = tgt
+            except Exception:
+                pass
+        if tgt is False:
+            return None
+        return self._scroll_target(tgt, ev)
+
+    def _resolve_wheel_target(self, w):
+        # Walk up to a bound target or a widget that supports yview_scroll
+        # (Canvas/Text/Listbox/Treeview); each step is a Tcl round-trip
         visited = 0
         while w is not None and visited < 10:
+            tgt = getattr(w, '_wheel_target', None)
+            if tgt is not None:
+                return tgt
             if hasattr(w, 'yview_scroll'):
-                return self._scroll_target(w, ev)
+                return w
             try:
                 parent_path = w.winfo_parent()
                 if not parent_path:
@@ -2973,14 +3711,15 @@ class TdGuiApp(tk.Tk):
             except Exception:
                 break
             visited += 1
-        return None
+        return False
 
     def _scroll_target(self, target, ev):
         # Compute scroll direction
         delta = 0
-        if hasattr(ev, 'num') and ev.num in (4, 5):
+        num = getattr(ev, 'num', None)
+        if num == 4 or num == 5:
             # X11 button scroll
-            delta = -1 if ev.num == 4 else 1
+            delta = -1 if num == 4 else 1
         else:
             # Windows and macOS: use sign of delta
             try:
@@ -2991,11 +3730,20 @@ class TdGuiApp(tk.Tk):
                 delta = -1 if d > 0 else 1
         # Only scroll if there is overflow (content doesn't fully fit)
         try:
-            if hasattr(target, 'yview'):
+            key = str(target)
+            overflow = self._overflow_cache.get(key)
+            if overflow is None:
+                # Every target we route to has yview; AttributeError lands below
                 first, last = target.yview()
                 # If the fraction span covers the whole content, don't intercept
-                if (last - first) >= 0.999:
-                    return None
+                overflow = (last - first) < 0.999
+                self._overflow_cache[key] = overflow
+                if key not in self._overflow_bound:
+                    self._overflow_bound.add(key)
+                    target.bind("<Configure>", lambda e, k=key: self._overflow_cache.pop(k, None), add=True)
+                    target.bind("<Destroy>", lambda e, k=key: self._forget_overflow(k), add=True)
+            if overflow is False:
+                return None
         except Exception:
             # If we can't determine, fall through to try scrolling
             pass
@@ -3010,16 +3758,22 @@ class TdGuiApp(tk.Tk):
 
     # ----- Theming helpers -----
     def _apply_theme(self):
-        c = self.colors
+        c = COLORS
+        # Hot palette entries as locals; the rest are read from c
+        bg, fg, surface, panel = c.bg, c.fg, c.surface, c.panel
+        line, primary, muted = c.line, c.primary, c.muted
         # Base window and default font
-        self.configure(background=c["bg"])
+        self.configure(background=bg)
+        # One Font handle for the named default font, reused wherever text is
+        # measured (nametofont() queries Tk's font list on every call)
+        self._ui_font = None
         try:
-            default_font = tkfont.nametofont("TkDefaultFont")
-            default_font.configure(size=10)
+            self._ui_font = tkfont.nametofont("TkDefaultFont")
+            self._ui_font.configure(size=10)
         except Exception:
             pass
 
-        style = ttk.Style(self)
+        style = self._style = ttk.Style(self)
         # Use a theme that respects color configs
         try:
             style.theme_use("clam")
@@ -3029,139 +3783,144 @@ class TdGuiApp(tk.Tk):
         # Global style tweaks
         style.configure(
             ".",
-            foreground=c["fg"],
-            background=c["bg"],
-            fieldbackground=c["surface"],
-            bordercolor=c["line"],
-            lightcolor=c["bg"],
-            darkcolor=c["bg"],
-            focuscolor=c["primary"],
+            foreground=fg,
+            background=bg,
+            fieldbackground=surface,
+            bordercolor=line,
+            lightcolor=bg,
+            darkcolor=bg,
+            focuscolor=primary,
         )
 
         # Containers / text
-        style.configure("TFrame", background=c["bg"])
-        style.configure("TLabelframe", background=c["bg"], foreground=c["fg"], bordercolor=c["line"], relief="groove")
-        style.configure("TLabelframe.Label", background=c["bg"], foreground=c["fg"])
-        style.configure("TLabel", background=c["bg"], foreground=c["fg"])
-
-        # Inputs
-        style.configure("TEntry", fieldbackground=c["surface"], foreground=c["fg"], bordercolor=c["line"]) 
-        try:
-            style.configure("TEntry", insertcolor=c["fg"])
-        except Exception:
-            pass
+        style.configure("TFrame", background=bg)
+        style.configure("TLabelframe", background=bg, foreground=fg, bordercolor=line, relief="groove")
+        style.configure("TLabelframe.Label", background=bg, foreground=fg)
+        style.configure("TLabel", background=bg, foreground=fg)
+
+        # Inputs. insertcolor isn't accepted everywhere: probe it once on a
+        # scratch style, then configure each input style in a single call
+        supports = getattr(self, '_supports_insertcolor', None)
+        if supports is None:
+            try:
+                style.configure("InsertProbe.TEntry", insertcolor=fg)
+                supports = True
+            except Exception:
+                supports = False
+            self._supports_insertcolor = supports
+        caret = {'insertcolor': fg} if supports else {}
+        style.configure("TEntry", fieldbackground=surface, foreground=fg, bordercolor=line, **caret)
         style.map("TEntry",
-                  fieldbackground=[('focus', c["surface"])],
-                  bordercolor=[('focus', c["primary"])])
+                  fieldbackground=[('focus', surface)],
+                  bordercolor=[('focus', primary)])
 
-        style.configure("TCombobox", fieldbackground=c["surface"], foreground=c["fg"], bordercolor=c["line"], arrowsize=12)
-        try:
-            style.configure("TCombobox", insertcolor=c["fg"])
-        except Exception:
-            pass
+        style.configure("TCombobox", fieldbackground=surface, foreground=fg, bordercolor=line, arrowsize=12, **caret)
         style.map("TCombobox",
-                  fieldbackground=[('readonly', c["surface"])],
-                  bordercolor=[('focus', c["primary"])],
-                  foreground=[('disabled', c["muted"])])
+                  fieldbackground=[('readonly', surface)],
+                  bordercolor=[('focus', primary)],
+                  foreground=[('disabled', muted)])
 
-        style.configure("TSpinbox", fieldbackground=c["surface"], foreground=c["fg"], bordercolor=c["line"]) 
-        style.map("TSpinbox", bordercolor=[('focus', c["primary"])])
+        style.configure("TSpinbox", fieldbackground=surface, foreground=fg, bordercolor=line) 
+        style.map("TSpinbox", bordercolor=[('focus', primary)])
 
         # Buttons
-        style.configure("TButton", background=c["panel"], foreground=c["fg"], bordercolor=c["line"], focusthickness=2, focuscolor=c["primary"]) 
+        style.configure("TButton", background=panel, foreground=fg, bordercolor=line, focusthickness=2, focuscolor=primary) 
         style.map("TButton",
-                  background=[('active', c["line"])],
-                  bordercolor=[('focus', c["primary"])])
-
-        style.configure("Accent.TButton", background=c["primary"], foreground=c["fg"], bordercolor=c["primary"], relief="flat")
-        style.map("Accent.TButton", background=[('active', c["primaryActive"])])
-
-        style.configure("Secondary.TButton", background=c["secondary"], foreground=c["fg"], bordercolor=c["secondary"], relief="flat")
-        style.map("Secondary.TButton", background=[('active', c["secondaryActive"])])
-
-        # Stop button style: red background with white text
-        try:
-            style.configure("Stop.TButton", background="#d9534f", foreground="#ffffff", bordercolor="#d9534f", relief="flat")
-            style.map("Stop.TButton", background=[('active', "#c9302c")], foreground=[('active', "#ffffff")])
-        except Exception:
-            pass
+                  background=[('active', line)],
+                  bordercolor=[('focus', primary)])
 
         # Notebook
-        style.configure("TNotebook", background=c["bg"], borderwidth=0, tabmargins=(6, 4, 6, 0))
-        style.configure("TNotebook.Tab", background=c["panel"], foreground=c["fg"], padding=(12, 6), bordercolor=c["line"]) 
+        style.configure("TNotebook", background=bg, borderwidth=0, tabmargins=(6, 4, 6, 0))
+        style.configure("TNotebook.Tab", background=panel, foreground=fg, padding=(12, 6), bordercolor=line) 
         style.map("TNotebook.Tab",
-                  background=[('selected', c["surface"]), ('active', c["panel"])],
-                  foreground=[('selected', c["fg"])])
-
-        # Progress bar
-        try:
-            style.configure(
-                "Loading.Horizontal.TProgressbar",
-                troughcolor=c["panel"],
-                background=c["primary"],
-                bordercolor=c["line"],
-            )
-        except Exception:
-            pass
-
-        # Route card styles
-        try:
-            style.configure("RouteCard.TFrame", background=c["panel"], bordercolor=c["line"], relief="groove")
-            style.configure("RouteCardSelected.TFrame", background=c["surface"], bordercolor=c["primary"], relief="solid")
-            style.configure("RouteTitle.TLabel", background=c["panel"], foreground=c["fg"]) 
-            style.configure("RouteBody.TLabel", background=c["panel"], foreground=c["muted"]) 
-        except Exception:
-            pass
+                  background=[('selected', surface), ('active', panel)],
+                  foreground=[('selected', fg)])
+
+        # Checkbox images shared by every selector item and editor flag row
+        self._check_imgs: Dict[str, tk.PhotoImage] = {}
+        for state, mark in (("off", None), ("on", primary), ("required", muted)):
+            img = tk.PhotoImage(master=self, width=14, height=14)
+            img.put(muted, to=(0, 0, 14, 14))
+            img.put(surface, to=(1, 1, 13, 13))
+            if mark:
+                img.put(mark, to=(3, 3, 11, 11))
+            self._check_imgs[state] = img
 
         # Paned window / scrollbars
-        style.configure("TPanedwindow", background=c["bg"], sashrelief="flat")
-        # Make the right-side vertical split (Selected Options vs Output) clearly resizable
-        try:
-            style.configure("RightSplit.TPanedwindow", background=c["bg"], sashrelief="raised")
-        except Exception:
-            pass
-        # Make the Output tab's internal splitter (Routes vs Console) clearly resizable
-        try:
-            style.configure("OutSplit.TPanedwindow", background=c["bg"], sashrelief="raised")
-        except Exception:
-            pass
-        style.configure("Vertical.TScrollbar", background=c["panel"], troughcolor=c["bg"], arrowcolor=c["fg"]) 
-        style.configure("Horizontal.TScrollbar", background=c["panel"], troughcolor=c["bg"], arrowcolor=c["fg"]) 
-
-        # Success (green) button for Load Command
-        try:
-            style.configure("Success.TButton", background=c["success"], foreground=c["fg"], bordercolor=c["success"], relief="flat")
-            style.map("Success.TButton", background=[('active', c["success"])])
-        except Exception:
-            pass
+        style.configure("TPanedwindow", background=bg, sashrelief="flat")
+        style.configure("Vertical.TScrollbar", background=panel, troughcolor=bg, arrowcolor=fg) 
+        style.configure("Horizontal.TScrollbar", background=panel, troughcolor=bg, arrowcolor=fg) 
+
+        # Named styles are configured by _ensure_style when a widget first
+        # asks for one, so startup only pays for the class defaults above
+        def _flat_button(name, bg, active, fg=fg, fg_active=None):
+            def build():
+                style.configure(name, background=bg, foreground=fg, bordercolor=bg, relief="flat")
+                if fg_active:
+                    style.map(name, background=[('active', active)], foreground=[('active', fg_active)])
+                else:
+                    style.map(name, background=[('active', active)])
+            return build
+
+        def _selector_tree():
+            style.configure("Selector.Treeview", background=bg, fieldbackground=bg, foreground=fg, borderwidth=0)
+            style.map("Selector.Treeview", background=[('selected', bg)], foreground=[('selected', fg)])
+
+        self._style_registry = {
+            "Accent.TButton": _flat_button("Accent.TButton", primary, c.primaryActive),
+            "Secondary.TButton": _flat_button("Secondary.TButton", c.secondary, c.secondaryActive),
+            # Stop button style: red background with white text
+            "Stop.TButton": _flat_button("Stop.TButton", "#d9534f", "#c9302c", fg="#ffffff", fg_active="#ffffff"),
+            # Success (green) button for Load Command
+            "Success.TButton": _flat_button("Success.TButton", c.success, c.success),
+            "Loading.Horizontal.TProgressbar": lambda: style.configure(
+                "Loading.Horizontal.TProgressbar",
+                troughcolor=panel,
+                background=primary,
+                bordercolor=line,
+            ),
+            # Option selector tree
+            "Selector.Treeview": _selector_tree,
+            # Route card styles
+            "RouteCard.TFrame": lambda: style.configure("RouteCard.TFrame", background=panel, bordercolor=line, relief="groove"),
+            "RouteCardSelected.TFrame": lambda: style.configure("RouteCardSelected.TFrame", background=surface, bordercolor=primary, relief="solid"),
+            "RouteTitle.TLabel": lambda: style.configure("RouteTitle.TLabel", background=panel, foreground=fg),
+            "RouteBody.TLabel": lambda: style.configure("RouteBody.TLabel", background=panel, foreground=muted, wraplength=900, justify="left"),
+            # Right-side vertical split (Selected Options vs Output) and the
+            # Output tab's splitter (Routes vs Console): clearly resizable
+            "RightSplit.TPanedwindow": lambda: style.configure("RightSplit.TPanedwindow", background=bg, sashrelief="raised"),
+            "OutSplit.TPanedwindow": lambda: style.configure("OutSplit.TPanedwindow", background=bg, sashrelief="raised"),
+        }
+        self._styles_built: set = set()
 
         # Tk widgets option db (Text/Listbox/Scrollbar popups)
-        self.option_add('*Text.background', c["surface"]) 
-        self.option_add('*Text.foreground', c["fg"]) 
-        self.option_add('*Text.insertBackground', c["fg"]) 
-        # Entry insertion cursor color (for classic Tk widgets and some ttk themes)
-        self.option_add('*Entry.insertBackground', c["fg"]) 
-        self.option_add('*Text.selectBackground', c["line"]) 
-        self.option_add('*Text.selectForeground', c["fg"]) 
-        self.option_add('*Listbox.background', c["surface"]) 
-        self.option_add('*Listbox.foreground', c["fg"]) 
-        self.option_add('*Listbox.selectBackground', c["line"]) 
-        self.option_add('*Listbox.selectForeground', c["fg"]) 
-        self.option_add('*Scrollbar.background', c["panel"]) 
-        self.option_add('*Scrollbar.activeBackground', c["panel"]) 
-        self.option_add('*Scrollbar.troughColor', c["bg"]) 
-        self.option_add('*Scrollbar.arrowColor', c["fg"]) 
+        call = self.tk.call
+        for pattern, color in _OPTION_PATTERNS:
+            call('option', 'add', pattern, getattr(c, color))
+
+    def _ensure_style(self, name: str) -> str:
+        # Configure a registered style the first time it is used; returns the
+        # name so it can be passed straight to style=
+        if name not in self._styles_built:
+            self._styles_built.add(name)
+            build = self._style_registry.get(name)
+            if build is not None:
+                try:
+                    build()
+                except Exception:
+                    pass
+        return name
 
     def _style_scrolled_text(self, widget: ScrolledText):
-        c = self.colors
+        c = COLORS
         try:
             widget.configure(
-                bg=c["surface"],
-                fg=c["fg"],
-                insertbackground=c["fg"],
+                bg=c.surface,
+                fg=c.fg,
+                insertbackground=c.fg,
                 highlightthickness=0,
-                selectbackground=c["line"],
-                selectforeground=c["fg"],
+                selectbackground=c.line,
+                selectforeground=c.fg,
                 borderwidth=0,
                 relief="flat",
             )
@@ -3171,10 +3930,14 @@ class TdGuiApp(tk.Tk):
     def _enable_copy_shortcuts(self, widget):
         # Bind Ctrl/Cmd+C to copy selected text in the widget to clipboard
         def _copy_sel(event=None):
+            # Check for a selection first instead of letting get() raise
             try:
-                text = widget.get("sel.first", "sel.last")
+                rng = widget.tag_ranges("sel")
+                if not rng:
+                    # No selection; keep clipboard unchanged
+                    return "break"
+                text = widget.get(rng[0], rng[1])
             except Exception:
-                # No selection; keep clipboard unchanged
                 return "break"
             try:
                 self.clipboard_clear()
@@ -3202,17 +3965,59 @@ class TdGuiApp(tk.Tk):
             self.db_var.set(f)
 
     # ----- Sticky-session helpers -----
-    def _schedule_save(self, delay_ms: int = 250):
-        try:
-            job = getattr(self, "_save_job", None)
-            if job:
+    def _schedule_save(self, delay_ms: int = _DEBOUNCE_MS):
+        # Mark prefs dirty and (re-)arm one save delay_ms after the last
+        # change, so a burst of changes costs a single serialize + write
+        self._prefs_dirty = True
+        job = getattr(self, "_save_job", None)
+        if job:
+            try:
                 self.after_cancel(job)
+            except Exception:
+                pass
+        try:
+            self._save_job = self.after(delay_ms, self._save_when_idle)
         except Exception:
-            pass
+            self._save_job = None
+
+    def _save_when_idle(self):
+        # The delay has passed; do the write once Tk has drained its pending
+        # events, so prefs I/O never lands in the middle of a burst of input.
+        # The idle id replaces the timer id, so cancelling still works
+        try:
+            self._save_job = self.after_idle(self._do_save_prefs)
+        except Exception:
+            self._do_save_prefs()
+
+    def _do_save_prefs(self):
+        self._save_job = None
+        # Nothing changed since the last write (e.g. a direct save ran)
+        if not getattr(self, '_prefs_dirty', False):
+            return
+        # Debounced saves skip the (possibly huge) output text; it is captured
+        # on command switch, export and close
+        self._save_prefs(capture_output=False)
+
+    def _schedule_preview(self, delay_ms: int = _DEBOUNCE_MS):
+        # Coalesce bursts of var-trace writes (typing) into one preview rebuild
+        self._cancel_preview()
         try:
-            self._save_job = self.after(delay_ms, self._save_prefs)
+            self._preview_pending = self.after(delay_ms, self._do_update_preview)
+        except Exception:
+            self._update_preview()
+
+    def _cancel_preview(self):
+        try:
+            job = getattr(self, "_preview_pending", None)
+            if job:
+                self.after_cancel(job)
         except Exception:
             pass
+        self._preview_pending = None
+
+    def _do_update_preview(self):
+        self._preview_pending = None
+        self._update_preview()
 
     def _on_sel_yview(self, first: str, last: str):
         # Forward to the scrollbar and remember scroll position
@@ -3220,16 +4025,8 @@ class TdGuiApp(tk.Tk):
             self.sel_scroll.set(first, last)
         except Exception:
             pass
-        try:
-            label = self.cmd_var.get()
-            data = dict(getattr(self, '_prefs', {}) or {})
-            cmd_state = data.setdefault('commands', {}).setdefault(label, {})
-            scroll = cmd_state.setdefault('scroll', {})
-            scroll['selected_yview'] = [float(first), float(last)]
-            self._prefs = data
-        except Exception:
-            pass
-        self._schedule_save()
+        self._note_overflow(self.sel_canvas, first, last)
+        self._queue_scroll_pref('selected_yview', first, last)
         return None
 
     def _on_output_yview(self, first: str, last: str):
@@ -3240,41 +4037,102 @@ class TdGuiApp(tk.Tk):
                 vbar.set(first, last)
         except Exception:
             pass
+        self._note_overflow(self.output, first, last)
+        self._queue_scroll_pref('output_yview', first, last)
+        return None
+
+    def _queue_scroll_pref(self, key: str, first: str, last: str):
+        # Scroll callbacks fire per pixel; keep only the latest position per
+        # view and fold them into prefs once the event burst is over
+        try:
+            self._pending_scroll[key] = [float(first), float(last)]
+        except Exception:
+            return
+        if self._scroll_flush_job is None:
+            try:
+                self._scroll_flush_job = self.after_idle(self._flush_scroll_prefs)
+            except Exception:
+                self._flush_scroll_prefs()
+
+    def _flush_scroll_prefs(self):
+        self._scroll_flush_job = None
+        pending, self._pending_scroll = self._pending_scroll, {}
+        if not pending:
+            return
         try:
             label = self.cmd_var.get()
-            data = dict(getattr(self, '_prefs', {}) or {})
-            cmd_state = data.setdefault('commands', {}).setdefault(label, {})
-            scroll = cmd_state.setdefault('scroll', {})
-            scroll['output_yview'] = [float(first), float(last)]
-            self._prefs = data
+            self._touch_cmd_state(self._prefs_data(), label).setdefault('scroll', {}).update(pending)
         except Exception:
             pass
         self._schedule_save()
-        return None
+
+    def _restore_scroll(self, scr):
+        # Parse both saved positions first, then move both views in a single
+        # idle callback once the pending layout has been done
+        pending = []
+        try:
+            scr = scr or {}
+            for widget, key in ((self.output, 'output_yview'), (self.sel_canvas, 'selected_yview')):
+                yv = scr.get(key)
+                if isinstance(yv, (list, tuple)) and len(yv) >= 1:
+                    try:
+                        pending.append((widget, float(yv[0])))
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+        if not pending:
+            return
+
+        def _apply(ps=pending):
+            for widget, first in ps:
+                self._safe_yview_moveto(widget, first)
+        try:
+            self.after_idle(_apply)
+        except Exception:
+            pass
 
     def _safe_yview_moveto(self, widget, first: float):
         try:
+            # Already there (e.g. a repeated restore): skip the relayout
+            if abs(widget.yview()[0] - first) < 1e-4:
+                return
             widget.yview_moveto(first)
         except Exception:
             pass
 
     # ----- Categorization -----
     def _categorize_current(self) -> List[Tuple[str, List[OptionSpec]]]:
+        # Grouping depends only on the command, so it is computed once per
+        # command form (discarded forms drop it with them)
         if not self.current_meta:
             return []
-        # Fallback: simple Required/Other
-        required = list(self.current_meta.arguments)
-        other = list(self.current_meta.switches)
+        form = self._form
+        if form is None:
+            return self._categorize(self.current_meta)
+        groups = form.get('groups')
+        if groups is None:
+            groups = form['groups'] = self._categorize(self.current_meta)
+        return groups
+
+    def _categorize(self, meta: CommandMeta) -> List[Tuple[str, List[OptionSpec]]]:
+        required = list(meta.arguments)
+        other = list(meta.switches)
+        if meta.name not in ('buildcache', 'run'):
+            # Generic fallback
+            return [("Required", required), ("Other", other)]
+
+        # The special layouts look specs up by dest (or long flag name)
+        specs_all = required + other
+        by_dest: Dict[str, OptionSpec] = {}
+        for s in specs_all:
+            key2 = s.long_flag.lstrip('-')
+            by_dest[s.dest or key2] = s
+            by_dest.setdefault(key2, s)
 
         # Special layout and defaults for 'buildcache'
-        if self.current_meta.name == 'buildcache':
+        if meta.name == 'buildcache':
             # Group frequently used flags prominently
-            by_dest = {}
-            for s in required + other:
-                key1 = s.dest or s.long_flag.lstrip('-')
-                key2 = s.long_flag.lstrip('-')
-                by_dest[key1] = s
-                by_dest.setdefault(key2, s)
             force = by_dest.get('force')
             ign   = by_dest.get('ignoreUnknown')
             sql   = by_dest.get('sqlFilename') or by_dest.get('--sql')
@@ -3287,32 +4145,18 @@ class TdGuiApp(tk.Tk):
             if secondary:
                 groups.append(("Other", secondary))
             # Ensure any remaining switches also appear
-            used = set(primary + secondary)
-            remaining = [s for s in (required + other) if s not in used]
+            used = set(primary)
+            used.update(secondary)
+            remaining = [s for s in specs_all if s not in used]
             if remaining:
                 groups.append(("Misc", remaining))
             return groups
 
         # Special layout for 'run'
-        if self.current_meta.name == 'run':
-            by_dest = {}
-            for s in required + other:
-                key1 = s.dest or s.long_flag.lstrip('-')
-                key2 = s.long_flag.lstrip('-')
-                by_dest[key1] = s
-                by_dest.setdefault(key2, s)
-            sects: List[Tuple[str, List[str]]] = [
-                ("Required", ["capacity", "credits"]),
-                ("Other", ["starting", "ending", "via", "limit", "blackMarket", "unique", "pruneScores", "shorten", "routes", "maxRoutes", "pruneHops"]),
-                ("Travel", ["goalSystem", "loop", "direct", "hops", "maxJumpsPer", "maxLyPer", "emptyLyPer", "startJumps", "endJumps", "showJumps", "supply", "demand"]),
-                ("Filters", ["avoid", "maxAge", "lsPenalty", "demand", "supply"]),
-                ("Constraints", ["padSize", "noPlanet", "planetary", "fleet", "odyssey", "maxLs"]),
-                ("Economy", ["minGainPerTon", "maxGainPerTon", "margin", "insurance"]),
-                ("Display", ["checklist", "x52pro", "progress", "summary"]),
-            ]
+        if meta.name == 'run':
             used = set()
             result: List[Tuple[str, List[OptionSpec]]] = []
-            for title, names in sects:
+            for title, names in _RUN_SECTIONS:
                 specs: List[OptionSpec] = []
                 for n in names:
                     s = by_dest.get(n)
@@ -3322,14 +4166,11 @@ class TdGuiApp(tk.Tk):
                 if specs:
                     result.append((title, specs))
             # Any remaining not categorized
-            remaining = [s for s in (required + other) if s not in used]
+            remaining = [s for s in specs_all if s not in used]
             if remaining:
                 result.append(("Misc", remaining))
             return result
 
-        # Generic fallback
-        return [("Required", required), ("Other", other)]
-
 
 def main():
     app = TdGuiApp()
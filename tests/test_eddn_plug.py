@@ -0,0 +1,239 @@
+import shutil
+import sqlite3
+import zlib
+from pathlib import Path
+
+import pytest
+
+from tradedangerous import TradeEnv
+from tradedangerous.tradedb import TradeDB
+from tradedangerous.plugins import eddn_plug
+
+_FIXTURE_DB = Path(__file__).parent / 'fixtures' / 'TradeDangerous.db'
+
+
+@pytest.fixture
+def plugin(tmp_path):
+    """An EDDN plugin over a private copy of the fixtures DB."""
+    db = tmp_path / 'TradeDangerous.db'
+    shutil.copy(_FIXTURE_DB, db)
+    tdenv = TradeEnv(dataDir=str(tmp_path), csvDir=str(tmp_path), tmpDir=str(tmp_path), dbFilename=str(db))
+    tdb = TradeDB(tdenv, load=False)
+    # Commit getDB()'s schema upgrade before the writer connects, as run()
+    # does via _ensure_lookup_indexes
+    tdb.getDB().commit()
+    yield eddn_plug.ImportPlugin(tdb, tdenv)
+    tdb.close()
+
+
+COMMODITY = b'https://eddn.edcd.io/schemas/commodity/3'
+
+
+class TestEddnSchema:
+    def test_sniff_schema(self):
+        sniff = eddn_plug._sniff_schema
+        assert sniff(b'{"$schemaRef": "' + COMMODITY + b'", "message": {}}') == COMMODITY
+        # JSON may escape '/'
+        assert sniff(rb'{"$schemaRef":"https:\/\/eddn.edcd.io\/schemas\/commodity\/3"}') == COMMODITY
+        # An escaped quote would end the value early: leave it to the parser
+        assert sniff(rb'{"$schemaRef":"a\"b"}') is None
+        assert sniff(b'{"header": {}}') is None
+
+    def test_sniff_schema_prefix_only(self):
+        # A "$schemaRef" deep inside the message isn't taken for the envelope's
+        filler = b'"x": "' + b'y' * 300 + b'", '
+        payload = b'{"message": {' + filler + b'"$schemaRef": "' + COMMODITY + b'"}}'
+        assert eddn_plug._sniff_schema(payload) is None
+
+    def test_unparsed_messages_not_counted(self, plugin):
+        # Sniffed as journal but never parsed: dropped without counting
+        plugin._handle_message(zlib.compress(b'{"$schemaRef": "https://eddn.edcd.io/schemas/journal/1", oops'))
+        # Unsniffable and malformed
+        plugin._handle_message(zlib.compress(b'{"header": {}, oops'))
+        assert plugin._stats['messages'] == 2
+        assert plugin._stats['journal_messages'] == 0
+        assert plugin._stats['commodity_messages'] == 0
+
+
+class TestEddnSymbols:
+    def test_norm_symbol(self):
+        norm = eddn_plug.ImportPlugin._norm_symbol
+        assert norm("Hydrogen Fuel") == "hydrogen_fuel"
+        assert norm(" Agri-Medicines ") == "agri_medicines"
+        assert norm("Fruit and Vegetables") == norm("Fruit & Vegetables")
+        assert norm("Meta-Alloys (Rare)") == "meta_alloys_rare"
+
+    def test_symbol_map_keys(self, plugin):
+        plugin._prepare_item_symbol_map()
+        sym_map = plugin._item_symbol_map
+        # Normalized TD name and the EDDN-style joined symbol
+        assert sym_map["hydrogen_fuel"] == 2
+        assert sym_map["hydrogenfuel"] == 2
+
+    def test_symbol_map_collision(self, plugin):
+        db = plugin.tdb.getDB()
+        db.execute("INSERT INTO Item (item_id, name, category_id) VALUES (9001, 'Test Alloy', 1)")
+        db.execute("INSERT INTO Item (item_id, name, category_id) VALUES (9002, 'Test-All Oy', 1)")
+        db.execute("INSERT INTO Item (item_id, name, category_id) VALUES (9003, 'Testfuel', 1)")
+        db.execute("INSERT INTO Item (item_id, name, category_id) VALUES (9004, 'Test Fuel', 1)")
+        plugin._prepare_item_symbol_map()
+        sym_map = plugin._item_symbol_map
+        # Two names that only differ by separators: neither gets the joined key
+        assert sym_map["test_alloy"] == 9001
+        assert sym_map["test_all_oy"] == 9002
+        assert "testalloy" not in sym_map
+        # A joined key never displaces another item's own name
+        assert sym_map["testfuel"] == 9003
+        assert sym_map["test_fuel"] == 9004
+
+    def test_symbol_norm_fallback(self, plugin):
+        plugin._prepare_item_symbol_map()
+        sym_map = plugin._item_symbol_map
+        # Mixed case misses the verbatim lookup; _norm_symbol resolves it
+        sym = "Hydrogen-Fuel"
+        assert sym not in sym_map
+        assert sym_map[plugin._norm_symbol(sym)] == 2
+
+
+STATION_ID = 2463  # H. G. Wells Hub, Luyten 205-128: 167 items in the fixtures
+TS = 1700000000    # 2023-11-14 22:13:20 UTC
+
+
+def _row(item_id, ts=TS, sell=100, demand=10, buy=90, stock=5):
+    return (STATION_ID, item_id, ts, sell, demand, 2, buy, stock, 3)
+
+
+def _write(plugin, db, rows, ts=TS, docking=None):
+    plugin._write_snapshot(db, STATION_ID, ts, docking, rows, 'H. G. Wells Hub', 'Luyten 205-128')
+
+
+def _items(plugin):
+    cur = plugin.tdb.getDB().execute(
+        "SELECT item_id, demand_price, supply_units, from_live, modified"
+        " FROM StationItem WHERE station_id = ? ORDER BY item_id", (STATION_ID,))
+    return cur.fetchall()
+
+
+class TestEddnWriter:
+    def test_snapshot_replaces_items(self, plugin):
+        db = plugin._open_writer_db()
+        _write(plugin, db, [_row(1), _row(2, sell=120)])
+        plugin._flush_batch(db, force=True)
+        db.close()
+        assert _items(plugin) == [
+            (1, 100, 5, 1, '2023-11-14 22:13:20'),
+            (2, 120, 5, 1, '2023-11-14 22:13:20'),
+        ]
+
+    def test_stale_item_newer_than_snapshot_is_deleted(self, plugin):
+        # Another importer stamped an item after the snapshot was taken; the
+        # snapshot doesn't list it, so it goes all the same
+        main = plugin.tdb.getDB()
+        main.execute("UPDATE StationItem SET modified = '2030-01-01 00:00:00'"
+                     " WHERE station_id = ? AND item_id = 3", (STATION_ID,))
+        main.commit()
+        db = plugin._open_writer_db()
+        _write(plugin, db, [_row(1)])
+        plugin._flush_batch(db, force=True)
+        db.close()
+        assert [row[0] for row in _items(plugin)] == [1]
+
+    def test_empty_snapshot_clears_station(self, plugin):
+        db = plugin._open_writer_db()
+        _write(plugin, db, [])
+        plugin._flush_batch(db, force=True)
+        db.close()
+        assert _items(plugin) == []
+
+    def test_batch_commits_at_station_limit(self, plugin, monkeypatch):
+        monkeypatch.setattr(eddn_plug, '_BATCH_STATIONS', 2)
+        monkeypatch.setattr(eddn_plug, '_BATCH_SECONDS', 3600)
+        db = plugin._open_writer_db()
+        _write(plugin, db, [_row(1)])
+        plugin._flush_batch(db)
+        # Still open: other connections see the old market
+        assert db.in_transaction
+        assert len(_items(plugin)) == 167
+        plugin._write_snapshot(db, 12, TS, None, [(12, 1, TS, 1, 1, 1, 1, 1, 1)], 'Ray Freeport', 'S')
+        plugin._flush_batch(db)
+        assert not db.in_transaction
+        assert plugin._batch_stations == []
+        db.close()
+        assert [row[0] for row in _items(plugin)] == [1]
+
+    def test_batch_commits_when_old(self, plugin, monkeypatch):
+        monkeypatch.setattr(eddn_plug, '_BATCH_SECONDS', 0)
+        db = plugin._open_writer_db()
+        _write(plugin, db, [_row(1)])
+        plugin._flush_batch(db)
+        assert not db.in_transaction
+        db.close()
+
+    def test_writer_thread(self, plugin):
+        plugin._start_writer()
+        plugin._queue_write((STATION_ID, TS, None, [_row(1), _row(2)], 'H. G. Wells Hub', 'Luyten 205-128'))
+        plugin._stop_writer()
+        assert plugin._writer is None
+        assert [row[0] for row in _items(plugin)] == [1, 2]
+        assert plugin._stats['items_written'] == 2
+
+    def test_writer_failure_drops_snapshots(self, plugin, monkeypatch):
+        def fail():
+            raise sqlite3.OperationalError("unable to open database file")
+
+        monkeypatch.setattr(plugin, '_open_writer_db', fail)
+        monkeypatch.setattr(eddn_plug, '_WRITE_QUEUE_SIZE', 1)
+        plugin._start_writer()
+        # More snapshots than the queue holds: none of them block
+        for n in range(5):
+            plugin._last_station_mod[STATION_ID] = TS + n
+            plugin._queue_write((STATION_ID, TS + n, None, [_row(1)], 'H. G. Wells Hub', 'Luyten 205-128'))
+        plugin._stop_writer()
+        assert len(_items(plugin)) == 167
+
+
+class TestEddnCaches:
+    def test_lru_evicts_least_recently_used(self):
+        cache = eddn_plug._LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        assert cache.get('a') == 1      # 'a' is now the most recent
+        cache['c'] = 3
+        assert list(cache) == ['a', 'c']
+        cache['a'] = 4                  # so is a re-assigned key
+        cache['d'] = 5
+        assert list(cache) == ['a', 'd']
+        assert cache.get('b', 'gone') == 'gone'
+
+    def test_plugin_caches_bounded(self, plugin):
+        for cache in (plugin._last_station_mod, plugin._last_docking):
+            assert isinstance(cache, eddn_plug._LRUCache)
+            assert cache.maxsize == plugin.cache_size == eddn_plug._CACHE_SIZE
+
+    def test_station_lookup_cached(self, plugin, monkeypatch):
+        calls = []
+        lookup = plugin._lookup_station
+
+        def counting_lookup(cur, system_name, station_name):
+            calls.append(station_name)
+            return lookup(cur, system_name, station_name)
+
+        monkeypatch.setattr(plugin, '_lookup_station', counting_lookup)
+        plugin._station_id_map = eddn_plug._LRUCache(1)
+
+        def message(station):
+            return {'message': {
+                'systemName': 'LUYTEN 205-128', 'stationName': station,
+                'timestamp': '2023-11-14T22:13:20Z',
+                'commodities': [{'name': 'hydrogenfuel', 'sellPrice': 100}],
+            }}
+
+        # Names are matched case-insensitively; misses are cached as well
+        for station in ('H. G. Wells Hub', 'h. g. wells hub', 'Nowhere', 'Nowhere'):
+            plugin._handle_commodity(message(station))
+        assert calls == ['H. G. Wells Hub', 'Nowhere']
+        assert plugin._stats['stations_skipped'] == 2
+        # Only cache_size stations are kept: the first is looked up again
+        plugin._handle_commodity(message('H. G. Wells Hub'))
+        assert calls == ['H. G. Wells Hub', 'Nowhere', 'H. G. Wells Hub']
+        assert list(plugin._station_id_map.values()) == [STATION_ID]
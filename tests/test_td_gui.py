@@ -0,0 +1,107 @@
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('tkinter')
+
+import td_gui   # noqa: E402
+
+
+class TestPreviewQuoting:
+    def test_plain_args_unquoted(self):
+        assert td_gui._quote_preview_arg("run") == "run"
+        assert td_gui._quote_preview_arg("--ly=10") == "--ly=10"
+        assert td_gui._quote_preview_arg(42) == "42"
+
+    def test_quoted_args(self):
+        quote = td_gui._quote_preview_arg
+        assert quote("") == '""'
+        assert quote("  ") == '""'
+        assert quote(" Sol ") == "Sol"
+        assert quote("Sol/Abraham Lincoln") == '"Sol/Abraham Lincoln"'
+        assert quote("Lave Station") == '"Lave Station"'
+        assert quote("a\tb") == '"a\tb"'
+        assert quote('say "hi"') == '"say \\"hi\\""'
+
+
+class TestCmdStateFilename:
+    def test_filename_is_safe(self):
+        name = td_gui._cmd_state_filename("run: Sol/Abraham Lincoln -> *")
+        assert name.startswith("td_gui_cmd_run_Sol_Abraham_Lincoln_")
+        assert name.endswith(".json")
+        assert all(ch.isalnum() or ch in "_-." for ch in name)
+
+    def test_filename_stable_and_distinct(self):
+        fn = td_gui._cmd_state_filename
+        assert fn("a b") == fn("a b")
+        # Same slug, different labels
+        assert fn("a b") != fn("a_b")
+        # Long labels are cut in the slug, not in the checksum
+        long_label = "x" * 100
+        assert len(fn(long_label)) < 70
+        assert fn(long_label) != fn(long_label + "y")
+
+
+class _App(SimpleNamespace):
+    # Just enough of TdGuiApp for its text helpers; no Tk window needed
+    _strip_ansi = td_gui.TdGuiApp._strip_ansi
+    _parse_routes = td_gui.TdGuiApp._parse_routes
+    _output_text = td_gui.TdGuiApp._output_text
+
+    def _flush_output(self, widget):
+        pass
+
+
+RUN_OUTPUT = (
+    "\x1b[1mSol/Abraham Lincoln -> Lave/Lave Station\x1b[0m (score: 1234.5)\n"
+    "  Load from Sol/Abraham Lincoln (1 ls):\n"
+    "     5 x Gold 9,000cr vs 9,500cr\n"
+    "  Jump Sol -> Lave\n"
+    "  Unload at Lave/Lave Station => Gain 2,500cr\n"
+    "Lave/Lave Station -> sol / abraham  lincoln\n"
+    "  Unload at Sol/Abraham Lincoln\n"
+)
+
+
+class TestParseRoutes:
+    def test_routes(self):
+        routes = _App()._parse_routes(RUN_OUTPUT)
+        assert routes.origs == ("Sol/Abraham Lincoln", "Lave/Lave Station")
+        assert routes.dests == ("Lave/Lave Station", "sol / abraham  lincoln")
+        assert routes.keys == (
+            ("SOL/ABRAHAM LINCOLN", "LAVE/LAVE STATION"),
+            ("LAVE/LAVE STATION", "SOL / ABRAHAM LINCOLN"),
+        )
+        assert routes.titles[0] == "Sol/Abraham Lincoln -> Lave/Lave Station (score: 1234.5)"
+        # "Jump a -> b" lines stay inside their route's block
+        assert "Jump Sol -> Lave" in routes.blocks[0]
+        assert routes.blocks[1].endswith("Unload at Sol/Abraham Lincoln")
+
+    def test_no_routes(self):
+        assert _App()._parse_routes("No profitable trades found.\n") == td_gui.ParsedRoutes()
+
+    def test_result_reused(self):
+        app = _App()
+        routes = app._parse_routes(RUN_OUTPUT)
+        assert app._parse_routes(RUN_OUTPUT) is routes
+        assert app._parse_routes(RUN_OUTPUT + "x") is not routes
+
+
+class _Output:
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, start, end):
+        return self.text
+
+
+class TestOutputText:
+    def test_raw_buffer_preferred(self):
+        # The widget only keeps the tail of a long run
+        app = _App(output=_Output("tail\n"), _raw_output=deque(["head\n", "tail\n"]))
+        assert app._output_text() == "head\ntail\n"
+
+    def test_widget_without_raw_buffer(self):
+        app = _App(output=_Output("progress\n"), _raw_output=deque())
+        assert app._output_text() == "progress\n"
@@ -14,11 +14,15 @@ Notes
 """
 from __future__ import annotations
 
+import collections
 import datetime as _dt
+import functools
 import json
 import os
+import queue
 import re
 import sqlite3
+import threading
 import time
 import typing
 import zlib
@@ -28,6 +32,11 @@ try:
 except Exception as _e:  # pragma: no cover
     zmq = None  # lazy error at runtime
 
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # stdlib json fallback
+
 from .. import plugins
 
 
@@ -36,6 +45,78 @@ if typing.TYPE_CHECKING:
     from .. tradedb import TradeDB
 
 
+# Envelope decoder; both accept the decompressed bytes as-is
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+_SCHEMA_KEY = b'"$schemaRef"'
+# The envelope's $schemaRef is looked for this far into a message only, so a
+# "$schemaRef" nested in a message body is never taken for it
+_SNIFF_BYTES = 256
+# Distinct $schemaRef values remembered by _schema_entry
+_SCHEMA_MEMO_MAX = 256
+
+# One commodity of a station snapshot; a row already present is updated in
+# place rather than deleted and re-inserted
+_UPSERT_ITEM = (
+    "INSERT INTO StationItem (station_id, item_id, modified, from_live, "
+    "demand_price, demand_units, demand_level, supply_price, supply_units, supply_level) "
+    "VALUES (?, ?, datetime(?, 'unixepoch'), 1, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(station_id, item_id) DO UPDATE SET "
+    "modified = excluded.modified, from_live = 1, "
+    "demand_price = excluded.demand_price, demand_units = excluded.demand_units, "
+    "demand_level = excluded.demand_level, supply_price = excluded.supply_price, "
+    "supply_units = excluded.supply_units, supply_level = excluded.supply_level"
+)
+# Items the snapshot didn't list: the station's item IDs are read back and
+# the ones missing from the snapshot deleted by key
+_SELECT_STATION_ITEMS = "SELECT item_id FROM StationItem WHERE station_id = ?"
+_DELETE_ITEM = "DELETE FROM StationItem WHERE station_id = ? AND item_id = ?"
+
+# Station snapshots are committed in batches: whichever limit is hit first
+_BATCH_STATIONS = 64
+_BATCH_SECONDS = 0.2
+# Snapshots waiting for the writer thread; a full queue holds the reader back
+_WRITE_QUEUE_SIZE = 1024
+# Messages taken from the socket per poll wakeup
+_DRAIN_MAX = 256
+# Default for the cache_size option: stations remembered per-station state
+_CACHE_SIZE = 50000
+# _station_id_map default for a pair not looked up yet (None is a known miss)
+_UNSEEN = object()
+
+# _norm_symbol: separators become '_', punctuation is dropped, runs of '_' collapse
+_RE_SEPS = re.compile(r"[\s\-]+")
+_PUNCT_TABLE = str.maketrans("", "", ".'()[],")
+_RE_UNDERS = re.compile(r"_+")
+
+# Initial inflate buffer. zlib's default (16 KiB) is smaller than a typical
+# decompressed commodity message (~100 entries), so it had to be regrown;
+# the unused tail is trimmed once when the result is returned
+_INFLATE_BUFSIZE = 65536
+
+
+def _sniff_schema(payload: bytes) -> typing.Optional[bytes]:
+    """Return the raw $schemaRef value of an EDDN envelope without parsing it,
+    or None if it can't be picked out within the first _SNIFF_BYTES (the
+    caller then parses as usual)."""
+    i = payload.find(_SCHEMA_KEY, 0, _SNIFF_BYTES)
+    if i < 0:
+        return None
+    # Next quote opens the value (only ':' and whitespace sit between)
+    end = i + len(_SCHEMA_KEY) + _SNIFF_BYTES
+    i = payload.find(b'"', i + len(_SCHEMA_KEY), end)
+    j = payload.find(b'"', i + 1, end) if i >= 0 else -1
+    if j < 0:
+        return None
+    ref = payload[i + 1:j]
+    # Escaped quotes would end the value early; JSON may also escape '/'
+    if b'\\' in ref:
+        if ref.endswith(b'\\'):
+            return None
+        ref = ref.replace(b'\\/', b'/')
+    return ref
+
+
 def _to_unix(ts: str) -> int:
     # EDDN timestamps are ISO 8601 UTC e.g. "2024-09-01T14:03:55Z" or with +00:00
     ts = ts.replace("Z", "+00:00")
@@ -51,6 +132,35 @@ def _to_unix(ts: str) -> int:
     return int(dt.timestamp())
 
 
+class _LRUCache(collections.OrderedDict):
+    """dict that keeps only its maxsize most recently used keys.
+
+    get() and assignment count as use. Used from both the reader and the
+    writer thread, so a key vanishing between two steps is tolerated.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+            self.move_to_end(key)
+        except KeyError:
+            return default
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        try:
+            self.move_to_end(key)
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+        except KeyError:
+            pass
+
+
 class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instance-attributes
     pluginOptions = {
         'host': 'EDDN ZMQ endpoint (default tcp://eddn.edcd.io:9500)',
@@ -59,6 +169,7 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
         'public_only': 'If set, only process carriers with carrierDockingAccess="all".',
         'optimize': 'VACUUM the DB after ingestion.',
         'debug_dump': 'Write last raw EDDN JSON to tmp/eddn_last.json for debugging.',
+        'cache_size': 'Stations to remember for lookups and snapshot dedupe (default 50000).',
     }
 
     def __init__(self, tdb: 'TradeDB', tdenv: 'TradeEnv'):
@@ -72,11 +183,36 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
         self.public_only = bool(self.getOption('public_only'))
         self.optimize = bool(self.getOption('optimize'))
         self.debug_dump = bool(self.getOption('debug_dump'))
+        try:
+            self.cache_size = max(1, int(self.getOption('cache_size') or _CACHE_SIZE))
+        except Exception:
+            self.cache_size = _CACHE_SIZE
 
         self._ctx = None
         self._sub = None
-        self._last_station_mod: dict[int, int] = {}
+        # station_id -> newest snapshot accepted; bounded, as a long session
+        # can see tens of thousands of carriers
+        self._last_station_mod = _LRUCache(self.cache_size)
         self._item_symbol_map: dict[str, int] = {}
+        # Writer thread: its queue, and the stations written in its open
+        # transaction and when that began
+        self._writes: typing.Optional[queue.Queue] = None
+        self._writer: typing.Optional[threading.Thread] = None
+        self._batch_stations: list[int] = []
+        self._batch_started = 0.0
+        # station_id -> carrier_docking_access last written (writer thread only)
+        self._last_docking = _LRUCache(self.cache_size)
+        # $schemaRef suffix -> (stats key, handler or None if unused)
+        self._schema_handlers = {
+            '/commodity/3': ('commodity_messages', self._handle_commodity),
+            # Currently unused, but could be extended to map MarketID->Station
+            '/journal/1': ('journal_messages', None),
+        }
+        # $schemaRef as seen (bytes sniffed, or str parsed) -> its entry
+        self._schema_entries: dict[typing.Any, tuple] = {}
+        # (system, station) lower-cased -> station_id, or None if unknown;
+        # bounded, as every unknown carrier name the feed reports lands here
+        self._station_id_map = _LRUCache(self.cache_size)
         self._stats = {
             'messages': 0,
             'commodity_messages': 0,
@@ -95,6 +231,7 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
 
         # Ensure DB exists / up to date so we can resolve stations & items.
         self.tdb.reloadCache()
+        self._ensure_lookup_indexes()
         self._prepare_item_symbol_map()
         self._connect()
 
@@ -136,50 +273,102 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
     def _connect(self):
         self._ctx = zmq.Context.instance()
         self._sub = self._ctx.socket(zmq.SUB)
+        # EDDN publishes single-frame, zlib-compressed messages with no topic
+        # frame, so a ZMQ prefix subscription can't select schemas; take
+        # everything and let _consume_loop sniff $schemaRef after inflating
         self._sub.setsockopt(zmq.SUBSCRIBE, b"")
         self._sub.connect(self.host)
 
-    def _consume_loop(self, started: float):  # pylint: disable=too-many-branches
+    def _consume_loop(self, started: float):
+        self._start_writer()
+        try:
+            self._consume(started)
+        finally:
+            # Covers the duration exit, Ctrl+C and errors alike: let the
+            # writer apply what's queued and commit
+            self._stop_writer()
+
+    def _consume(self, started: float):
         poller = zmq.Poller()
         poller.register(self._sub, zmq.POLLIN)
+        recv = self._sub.recv
         while True:
             if self.duration and (time.time() - started) >= self.duration:
                 return
-            events = dict(poller.poll(timeout=500))
-            if self._sub not in events:
+            if not poller.poll(timeout=500):
                 continue
-            try:
-                zdata = self._sub.recv(flags=zmq.NOBLOCK, copy=False)
-            except zmq.error.Again:
-                continue
-            self._stats['messages'] += 1
-            try:
-                payload = zlib.decompress(zdata)
-            except Exception as e:  # pragma: no cover
-                self.tdenv.DEBUG1("EDDN: zlib error {}", e)
-                continue
-            try:
-                data = json.loads(payload)
-            except Exception as e:  # pragma: no cover
-                self.tdenv.DEBUG1("EDDN: json error {}", e)
-                continue
-            if self.debug_dump:
+            # Drain what's queued on the socket before polling again; capped
+            # so a busy feed still gets back to the duration check
+            for _ in range(_DRAIN_MAX):
                 try:
-                    os.makedirs(self.tdenv.tmpDir, exist_ok=True)
-                    tmp = os.path.join(self.tdenv.tmpDir, 'eddn_last.json')
-                    with open(tmp, 'wb') as fh:
-                        fh.write(payload)
-                except Exception:
-                    pass
-
-            schema = data.get('$schemaRef', '')
-            if schema.endswith('/commodity/3'):
-                self._stats['commodity_messages'] += 1
-                self._handle_commodity(data)
-            elif schema.endswith('/journal/1'):
-                self._stats['journal_messages'] += 1
-                # Currently unused, but could be extended to map MarketID->Station
-                # self._handle_journal(data)
+                    zdata = recv(flags=zmq.NOBLOCK, copy=False)
+                except zmq.error.Again:
+                    break
+                self._handle_message(zdata)
+
+    def _handle_message(self, zdata):
+        self._stats['messages'] += 1
+        # zdata is a zmq.Frame (recv copy=False); zlib reads it through the
+        # buffer protocol, so don't wrap it in bytes() (that would copy it)
+        try:
+            payload = zlib.decompress(zdata, zlib.MAX_WBITS, _INFLATE_BUFSIZE)
+        except Exception as e:  # pragma: no cover
+            self.tdenv.DEBUG1("EDDN: zlib error {}", e)
+            return
+        if self.debug_dump:
+            try:
+                os.makedirs(self.tdenv.tmpDir, exist_ok=True)
+                tmp = os.path.join(self.tdenv.tmpDir, 'eddn_last.json')
+                with open(tmp, 'wb') as fh:
+                    fh.write(payload)
+            except Exception:
+                pass
+
+        # Only schemas with a handler are used; classify the rest from the
+        # raw bytes so they never reach the JSON decoder. Those are dropped
+        # uncounted: per-schema stats only count messages that parsed
+        schema = _sniff_schema(payload)
+        entry = self._schema_entry(schema) if schema is not None else None
+        if entry is not None and entry[1] is None:
+            return
+        try:
+            data = _json_loads(payload)
+        except Exception as e:  # pragma: no cover
+            self.tdenv.DEBUG1("EDDN: json error {}", e)
+            return
+        if not isinstance(data, dict):
+            return
+        if entry is None:
+            # Couldn't sniff it; go by the parsed envelope
+            entry = self._schema_entry(str(data.get('$schemaRef') or ''))
+            if entry[1] is None:
+                if entry[0]:
+                    self._stats[entry[0]] += 1
+                return
+        stat, handler = entry
+        self._stats[stat] += 1
+        handler(data)
+
+    def _schema_entry(self, ref: typing.Union[bytes, str]) -> tuple:
+        """(stats key, handler) for a $schemaRef; (None, None) if unknown.
+
+        Each message class repeats the same ref, so after the first match on
+        _schema_handlers suffixes this is a single dict lookup.
+        """
+        try:
+            return self._schema_entries[ref]
+        except KeyError:
+            pass
+        name = ref.decode('utf-8', 'replace') if isinstance(ref, bytes) else ref
+        entry = (None, None)
+        for suffix, handler in self._schema_handlers.items():
+            if name.endswith(suffix):
+                entry = handler
+                break
+        # Bounded: a feed of made-up refs mustn't grow it forever
+        if len(self._schema_entries) < _SCHEMA_MEMO_MAX:
+            self._schema_entries[ref] = entry
+        return entry
 
     # ----- Commodity processing -----
     def _handle_commodity(self, data: dict):  # pylint: disable=too-many-locals,too-many-branches
@@ -202,36 +391,16 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
         if not (system_name and station_name and ts and commodities):
             return
 
-        # Resolve station_id via (System.name, Station.name)
-        db = self.tdb.getDB()
-        cur = db.cursor()
-        cur.execute("SELECT system_id FROM System WHERE name = ? COLLATE NOCASE", (system_name,))
-        row = cur.fetchone()
-        if not row:
-            self._stats['stations_skipped'] += 1
-            self.tdenv.DEBUG1("EDDN: unknown system '{}' for station '{}'", system_name, station_name)
-            return
-        system_id = int(row[0])
-        cur.execute(
-            "SELECT station_id FROM Station WHERE system_id = ? AND name = ? COLLATE NOCASE",
-            (system_id, station_name),
-        )
-        row = cur.fetchone()
-        if not row:
+        # Resolve station_id via (System.name, Station.name). Lookups read
+        # the main connection; all writes happen on the writer thread
+        key = (system_name.lower(), station_name.lower())
+        station_id = self._station_id_map.get(key, _UNSEEN)
+        if station_id is _UNSEEN:
+            cur = self.tdb.getDB().cursor()
+            station_id = self._station_id_map[key] = self._lookup_station(cur, system_name, station_name)
+        if station_id is None:
             self._stats['stations_skipped'] += 1
-            self.tdenv.DEBUG1("EDDN: unknown station '{} @ {}'", station_name, system_name)
             return
-        station_id = int(row[0])
-
-        # Update docking policy if provided
-        if docking:
-            try:
-                cur.execute(
-                    "UPDATE Station SET carrier_docking_access = ? WHERE station_id = ?",
-                    (str(docking), station_id),
-                )
-            except sqlite3.Error:
-                pass
 
         # Timestamp handling and station-level dedupe
         try:
@@ -240,63 +409,281 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
             ts_unix = int(time.time())
         last_mod = self._last_station_mod.get(station_id, 0)
         if last_mod and ts_unix <= last_mod:
-            # Older or equal snapshot; ignore
+            # Older or equal snapshot; only the docking policy may apply
+            if docking:
+                self._queue_write((station_id, ts_unix, docking, None, station_name, system_name))
             return
 
-        # Flush old StationItem rows for this station and insert fresh snapshot
-        try:
-            cur.execute("BEGIN TRANSACTION")
-            cur.execute("DELETE FROM StationItem WHERE station_id = ?", (station_id,))
-            add_stmt = (
-                "INSERT OR REPLACE INTO StationItem (station_id, item_id, modified, from_live, "
-                "demand_price, demand_units, demand_level, supply_price, supply_units, supply_level) "
-                "VALUES (?, ?, datetime(?, 'unixepoch'), 1, ?, ?, ?, ?, ?, ?)"
+        # Build the snapshot rows for the writer: sized for every commodity
+        # up front, trimmed to the ones that resolved
+        rows: list = [None] * len(commodities)
+        n = 0
+        sym_map = self._item_symbol_map
+        _int = int
+        for c in commodities:
+            get = c.get
+            sym = get('name')
+            if not sym:
+                continue
+            # EDDN symbols are usually keys already; normalize only on a miss
+            item_id = sym_map.get(sym) or sym_map.get(self._norm_symbol(sym))
+            if not item_id:
+                self._stats['items_skipped'] += 1
+                self.tdenv.DEBUG1("EDDN: unknown commodity '{}' at '{} @ {}'", sym, station_name, system_name)
+                continue
+            # Map CAPI fields into TD StationItem columns; a missing or empty
+            # ("") field is 0, or -1 (unknown) for the brackets
+            rows[n] = (
+                station_id, item_id, ts_unix,
+                _int(get('sellPrice') or 0),                    # demand_price
+                _int(get('demand') or 0),                       # demand_units
+                _int(get('demandBracket') or -1),               # demand_level
+                _int(get('buyPrice') or 0),                     # supply_price
+                _int(get('stock') or 0),                        # supply_units
+                _int(get('stockBracket') or -1),                # supply_level
             )
-            written = 0
-            for c in commodities:
-                sym = c.get('name')
-                if not sym:
-                    continue
-                item_id = self._item_symbol_map.get(self._norm_symbol(sym))
-                if not item_id:
-                    self._stats['items_skipped'] += 1
-                    self.tdenv.DEBUG1("EDDN: unknown commodity '{}' at '{} @ {}'", sym, station_name, system_name)
-                    continue
-                # Map CAPI fields into TD StationItem columns
-                demand_price = int(c.get('sellPrice') or 0)
-                demand_units = int(c.get('demand') or 0)
-                demand_level = int((c.get('demandBracket') or -1) or -1)
-                supply_price = int(c.get('buyPrice') or 0)
-                supply_units = int(c.get('stock') or 0)
-                supply_level = int((c.get('stockBracket') or -1) or -1)
+            n += 1
+        del rows[n:]
+        if rows:
+            # Claimed now so a resend queued behind this one is dropped; the
+            # writer releases it again if the write fails
+            self._last_station_mod[station_id] = ts_unix
+        self._queue_write((station_id, ts_unix, docking, rows, station_name, system_name))
+
+    # ----- DB writer thread -----
+    def _start_writer(self):
+        self._writes = queue.Queue(maxsize=_WRITE_QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._db_writer, name="eddn-db-writer", daemon=True)
+        self._writer.start()
+
+    def _stop_writer(self):
+        writer = self._writer
+        if writer is None:
+            return
+        # Don't block on a full queue if the writer has already gone
+        while writer.is_alive():
+            try:
+                self._writes.put(None, timeout=1.0)
+                break
+            except queue.Full:
+                pass
+        writer.join()
+        self._writer = None
+
+    def _queue_write(self, item: tuple):
+        """Hand a snapshot to the writer thread; a full queue holds the
+        reader back, but a writer that has died drops the snapshot instead."""
+        writer = self._writer
+        while writer is not None and writer.is_alive():
+            try:
+                self._writes.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                pass
+        self._last_station_mod.pop(item[0], None)
+
+    def _drain_writes(self):
+        # Discard snapshots until the stop marker so the producer never blocks
+        writes = self._writes
+        while writes.get() is not None:
+            pass
+
+    def _open_writer_db(self) -> sqlite3.Connection:
+        # Same settings as TradeDB.getDB(), plus the streaming tweaks. The
+        # writer reuses a handful of SQL strings; keep them all prepared
+        db = sqlite3.connect(self.tdb.dbFilename, cached_statements=256)
+        db.execute("PRAGMA foreign_keys=ON")
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute("PRAGMA temp_store=MEMORY")
+        self._tune_db(db)
+        return db
+
+    def _db_writer(self):
+        """Apply queued station snapshots on a connection of its own.
+
+        Snapshots are committed in batches of _BATCH_STATIONS stations or
+        _BATCH_SECONDS, whichever comes first. None on the queue stops it.
+        """
+        writes = self._writes
+        try:
+            db = self._open_writer_db()
+        except Exception as e:
+            self.tdenv.WARN("EDDN: can't open the DB for writing: {}", e)
+            self._drain_writes()
+            return
+        try:
+            while True:
+                timeout = None
+                if db.in_transaction:
+                    timeout = max(0.0, _BATCH_SECONDS - (time.monotonic() - self._batch_started))
+                try:
+                    item = writes.get(timeout=timeout)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    self._write_snapshot(db, *item)
+                self._flush_batch(db)
+        except Exception as e:
+            self.tdenv.WARN("EDDN: DB writer stopped, dropping further snapshots: {}", e)
+            self._close_writer_db(db)
+            self._drain_writes()
+            return
+        self._close_writer_db(db)
+
+    def _close_writer_db(self, db: sqlite3.Connection):
+        try:
+            self._flush_batch(db, force=True)
+        except Exception as e:  # pragma: no cover
+            self.tdenv.WARN("EDDN: final commit failed: {}", e)
+        try:
+            db.close()
+        except Exception:
+            pass
+
+    def _write_snapshot(self, db: sqlite3.Connection, station_id: int, ts_unix: int,
+                        docking, rows: typing.Optional[list], station_name: str, system_name: str):
+        # Update docking policy if provided and not what we last wrote
+        if docking:
+            docking = str(docking)
+            if self._last_docking.get(station_id) == docking:
+                docking = None
+        if rows is None and not docking:
+            return
+
+        # Writes join the open batch transaction (see _flush_batch)
+        if not db.in_transaction:
+            try:
+                db.execute("BEGIN")
+            except sqlite3.Error as e:
+                self._last_station_mod.pop(station_id, None)
+                self.tdenv.WARN("EDDN DB error at '{} @ {}': {}", station_name, system_name, e)
+                return
+            self._batch_started = time.monotonic()
+        cur = db.cursor()
+
+        if docking:
+            try:
                 cur.execute(
-                    add_stmt,
-                    (
-                        station_id, item_id, ts_unix,
-                        demand_price, demand_units, demand_level,
-                        supply_price, supply_units, supply_level,
-                    ),
+                    "UPDATE Station SET carrier_docking_access = ? WHERE station_id = ?",
+                    (docking, station_id),
                 )
-                written += 1
-            cur.execute("COMMIT")
-            if written:
+                self._last_docking[station_id] = docking
+            except sqlite3.Error:
+                pass
+        if rows is None:
+            return
+
+        # Upsert the fresh snapshot, then drop this station's items it no
+        # longer lists, whoever wrote them. A savepoint keeps a failure here
+        # from discarding the other stations in the batch
+        try:
+            cur.execute("SAVEPOINT eddn_station")
+            if rows:
+                cur.executemany(_UPSERT_ITEM, rows)
+            listed = {row[1] for row in rows}
+            cur.execute(_SELECT_STATION_ITEMS, (station_id,))
+            stale = [(station_id, item_id) for (item_id,) in cur.fetchall() if item_id not in listed]
+            if stale:
+                cur.executemany(_DELETE_ITEM, stale)
+            cur.execute("RELEASE eddn_station")
+            self._batch_stations.append(station_id)
+            if rows:
                 self._stats['stations_matched'] += 1
-                self._stats['items_written'] += written
-                self._last_station_mod[station_id] = ts_unix
+                self._stats['items_written'] += len(rows)
         except sqlite3.Error as e:  # pragma: no cover
             try:
-                cur.execute("ROLLBACK")
+                cur.execute("ROLLBACK TO eddn_station")
+                cur.execute("RELEASE eddn_station")
             except Exception:
                 pass
+            self._last_station_mod.pop(station_id, None)
             self.tdenv.WARN("EDDN DB error at '{} @ {}': {}", station_name, system_name, e)
 
+    def _flush_batch(self, db: sqlite3.Connection, force: bool = False):
+        """Commit the open batch once it holds _BATCH_STATIONS stations or is
+        _BATCH_SECONDS old (or right away with force)."""
+        if not db.in_transaction:
+            return
+        if (not force and len(self._batch_stations) < _BATCH_STATIONS
+                and time.monotonic() - self._batch_started < _BATCH_SECONDS):
+            return
+        stations, self._batch_stations = self._batch_stations, []
+        try:
+            db.commit()
+        except sqlite3.Error as e:  # pragma: no cover
+            self.tdenv.WARN("EDDN DB error committing {} stations: {}", len(stations), e)
+            try:
+                db.rollback()
+            except Exception:
+                pass
+            # Those snapshots never landed; accept a resend
+            for station_id in stations:
+                self._last_station_mod.pop(station_id, None)
+            # Nor did any docking updates in the batch
+            self._last_docking.clear()
+
     # ----- Helpers -----
+    def _lookup_station(self, cur: sqlite3.Cursor, system_name: str, station_name: str) -> typing.Optional[int]:
+        """Resolve a station ID by system and station name (case-insensitive).
+
+        Results, misses included, are kept in _station_id_map (this plugin
+        never adds stations mid-run), so this runs once per station until
+        the station drops out of that cache_size LRU.
+        """
+        cur.execute("SELECT system_id FROM System WHERE name = ? COLLATE NOCASE", (system_name,))
+        row = cur.fetchone()
+        if not row:
+            self.tdenv.DEBUG1("EDDN: unknown system '{}' for station '{}'", system_name, station_name)
+            return None
+        system_id = int(row[0])
+        cur.execute(
+            "SELECT station_id FROM Station WHERE system_id = ? AND name = ? COLLATE NOCASE",
+            (system_id, station_name),
+        )
+        row = cur.fetchone()
+        if not row:
+            self.tdenv.DEBUG1("EDDN: unknown station '{} @ {}'", station_name, system_name)
+            return None
+        return int(row[0])
+
+    def _ensure_lookup_indexes(self):
+        """Index System.name for _lookup_station.
+
+        The schema has no index on it, so each unseen station cost a scan of
+        System. The column is declared COLLATE NOCASE, so a plain index
+        serves the NOCASE lookup; Station is covered by idx_station_by_system.
+        """
+        db = self.tdb.getDB()
+        try:
+            db.execute("CREATE INDEX IF NOT EXISTS idx_system_by_name ON System (name)")
+            db.commit()
+        except sqlite3.Error as e:
+            self.tdenv.DEBUG1("EDDN: can't index System.name: {}", e)
+
+    def _tune_db(self, db: sqlite3.Connection):
+        """Connection settings for a long run of small write transactions.
+
+        The writer runs with synchronous=OFF and temp_store=MEMORY like
+        TradeDB.getDB(); add WAL (the schema template's default, but older
+        DBs may predate it) and a larger page cache.
+        """
+        for pragma in ("PRAGMA journal_mode=WAL", "PRAGMA cache_size=-65536"):
+            try:
+                db.execute(pragma)
+            except sqlite3.Error as e:
+                self.tdenv.DEBUG1("EDDN: {} failed: {}", pragma, e)
+
     def _prepare_item_symbol_map(self):
         """Build a map from EDDN/CAPI commodity symbolic names to Item.item_id.
 
         We derive a normalized symbol from TD's Item.name to avoid needing
         external mapping files. This handles typical punctuation/hyphen/space
-        variants between CAPI and DB naming.
+        variants between CAPI and DB naming. Each name is also keyed without
+        the underscores ("hydrogenfuel"), the form EDDN symbols take, so most
+        of them hit the map verbatim. Those joined keys never displace a
+        normalized name, and one shared by several items is left out.
         """
         db = self.tdb.getDB()
         cur = db.execute("SELECT item_id, name FROM Item")
@@ -305,15 +692,29 @@ class ImportPlugin(plugins.ImportPluginBase):  # pylint: disable=too-many-instan
             sym = self._norm_symbol(name)
             # Avoid overwrites; first wins
             sym_map.setdefault(sym, int(item_id))
+        joined: dict[str, set] = {}
+        for sym, item_id in sym_map.items():
+            key = sym.replace('_', '')
+            if key != sym:
+                joined.setdefault(key, set()).add(item_id)
+        for key, ids in joined.items():
+            taken = sym_map.get(key)
+            if len(ids) > 1 or (taken is not None and taken not in ids):
+                self.tdenv.DEBUG1("EDDN: symbol '{}' is ambiguous (items {}), not mapped",
+                                  key, sorted(ids | {taken} - {None}))
+                continue
+            sym_map[key] = next(iter(ids))
         self._item_symbol_map = sym_map
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def _norm_symbol(name: str) -> str:
+        # Called for every commodity of every message, over a small fixed
+        # set of names: memoized
         s = name.strip().lower()
         # Normalize common punctuation/spaces to underscore
         s = s.replace('&', 'and')
-        s = re.sub(r"[\s\-]+", "_", s)
-        s = re.sub(r"[\.\'\(\)\[\],]", "", s)
+        s = _RE_SEPS.sub("_", s)
+        s = s.translate(_PUNCT_TABLE)
         # Collapse multiple underscores
-        s = re.sub(r"_+", "_", s)
-        return s
+        return _RE_UNDERS.sub("_", s)